@@ -0,0 +1,253 @@
+/*
+ * Remarkable live preview helpers.
+ *
+ * The preview body is a sequence of blocks, each preceded by a
+ * <!--remarkable-block--> comment and terminated by <!--remarkable-end-->.
+ * remarkable.patch() replaces a run of blocks in place so the page, its
+ * stylesheets and scripts never have to be reloaded while typing, and
+ * remarkable.setStyle() swaps the document style sheet.
+ *
+ * For scroll synchronisation the page reports the offset of every block
+ * whenever its layout changes, and the user's scroll position once per
+ * frame, through the "remarkable" script message handler.
+ *
+ * Typeset formulas are cached by display mode and TeX source. A patched
+ * block reuses copies of the rendered formulas it shares with the blocks it
+ * replaces, and MathJax only typesets formulas that are new or changed.
+ */
+var remarkable = (function () {
+    var BLOCK = 'remarkable-block';
+    var END = 'remarkable-end';
+    var measuring = false;
+    var scrolling = false;
+    var ignoredScroll = null;
+    var MAX_FORMULAS = 2000;
+    var formulas = new Map();  // Mode and TeX source -> typeset <mathjax> element, oldest first
+
+    function post(message) {
+        var handlers = window.webkit && window.webkit.messageHandlers;
+        if (handlers && handlers.remarkable) {
+            handlers.remarkable.postMessage(JSON.stringify(message));
+        }
+    }
+
+    function measure() {
+        if (measuring) {
+            return;
+        }
+        measuring = true;
+        window.requestAnimationFrame(function () {
+            measuring = false;
+            var found = markers();
+            if (found === null) {
+                return;
+            }
+            var offsets = [];
+            var range = document.createRange();
+            for (var i = 0; i < found.blocks.length; i++) {
+                range.setStartAfter(found.blocks[i]);
+                range.setEndBefore(i + 1 < found.blocks.length ? found.blocks[i + 1] : found.end);
+                offsets.push(range.getBoundingClientRect().top + window.scrollY);
+            }
+            post({ offsets: offsets, height: document.documentElement.scrollHeight });
+        });
+    }
+
+    function onScroll() {
+        if (ignoredScroll !== null && Math.abs(window.scrollY - ignoredScroll) < 1) {
+            ignoredScroll = null;  // Caused by scrollTo()
+            return;
+        }
+        ignoredScroll = null;
+        if (scrolling) {
+            return;
+        }
+        scrolling = true;
+        window.requestAnimationFrame(function () {
+            scrolling = false;
+            post({ scroll: window.scrollY });
+        });
+    }
+
+    function scrollTo(y) {
+        y = Math.max(0, Math.min(y, document.documentElement.scrollHeight - window.innerHeight));
+        if (Math.abs(window.scrollY - y) >= 1) {
+            ignoredScroll = y;
+            window.scrollTo(0, y);
+        }
+        return true;
+    }
+
+    function markers() {
+        var blocks = [];
+        for (var node = document.body.firstChild; node; node = node.nextSibling) {
+            if (node.nodeType === Node.COMMENT_NODE) {
+                if (node.data === BLOCK) {
+                    blocks.push(node);
+                } else if (node.data === END) {
+                    return { blocks: blocks, end: node };
+                }
+            }
+        }
+        return null;
+    }
+
+    function formulaKey(element) {
+        var tex = element.textContent;
+        return (tex.lastIndexOf('$$', 0) === 0 ? 'display:' : 'inline:') + tex;
+    }
+
+    function remember(element) {
+        var key = element.remarkableFormula;
+        if (key === undefined || formulas.has(key)) {
+            return;
+        }
+        var copy = element.cloneNode(true);
+        // The copies are only for show: MathJax must not find their sources
+        // again, and element ids have to stay unique
+        var scripts = copy.querySelectorAll('script');
+        for (var i = 0; i < scripts.length; i++) {
+            scripts[i].parentNode.removeChild(scripts[i]);
+        }
+        var ids = copy.querySelectorAll('[id]');
+        for (var j = 0; j < ids.length; j++) {
+            ids[j].removeAttribute('id');
+        }
+        formulas.set(key, copy);
+        if (formulas.size > MAX_FORMULAS) {
+            formulas.delete(formulas.keys().next().value);
+        }
+    }
+
+    function reuse(element, key) {
+        var cached = formulas.get(key);
+        if (cached === undefined) {
+            return false;
+        }
+        formulas.delete(key);  // Most recently used last
+        formulas.set(key, cached);
+        var copy = cached.cloneNode(true);
+        element.textContent = '';
+        while (copy.firstChild) {
+            element.appendChild(copy.firstChild);
+        }
+        element.classList.add('tex2jax_ignore');
+        return true;
+    }
+
+    function rememberAll() {
+        var elements = document.getElementsByTagName('mathjax');
+        for (var i = 0; i < elements.length; i++) {
+            remember(elements[i]);
+        }
+    }
+
+    function typeset(nodes) {
+        var fresh = [];
+        var environments = [];
+        for (var i = 0; i < nodes.length; i++) {
+            var node = nodes[i];
+            var elements = node.tagName === 'MATHJAX' ? [node] : node.getElementsByTagName('mathjax');
+            for (var j = 0; j < elements.length; j++) {
+                var key = formulaKey(elements[j]);
+                elements[j].remarkableFormula = key;
+                if (!reuse(elements[j], key)) {
+                    fresh.push(elements[j]);
+                }
+            }
+            if (node.textContent.indexOf('\\begin{') !== -1) {
+                environments.push(node);  // TeX environments outside $...$
+            }
+        }
+        // Before MathJax has started up, its first pass typesets the page
+        if ((fresh.length || environments.length) && window.MathJax && MathJax.Hub) {
+            MathJax.Hub.Queue(['Typeset', MathJax.Hub, fresh.concat(environments)], function () {
+                fresh.forEach(remember);
+                measure();
+            });
+        }
+    }
+
+    function refresh(nodes) {
+        var elements = [];
+        for (var i = 0; i < nodes.length; i++) {
+            var node = nodes[i];
+            if (node.nodeType !== Node.ELEMENT_NODE) {
+                continue;
+            }
+            elements.push(node);
+            if (window.hljs) {
+                // Blocks highlighted while rendering already have the hljs class
+                var code = node.querySelectorAll('pre code:not(.hljs)');
+                for (var j = 0; j < code.length; j++) {
+                    hljs.highlightBlock(code[j]);
+                }
+            }
+        }
+        typeset(elements);
+    }
+
+    function patch(start, count, fragments) {
+        var found = markers();
+        if (found === null || start + count > found.blocks.length) {
+            return false;
+        }
+        var first = start < found.blocks.length ? found.blocks[start] : found.end;
+        var after = start + count < found.blocks.length ? found.blocks[start + count] : found.end;
+        for (var node = first; node !== after; ) {
+            var next = node.nextSibling;
+            document.body.removeChild(node);
+            node = next;
+        }
+
+        var template = document.createElement('template');
+        template.innerHTML = fragments.map(function (html) {
+            return '<!--' + BLOCK + '-->' + html + '\n';
+        }).join('');
+        var inserted = Array.prototype.slice.call(template.content.childNodes);
+        document.body.insertBefore(template.content, after);
+        refresh(inserted);
+        measure();
+        return true;
+    }
+
+    function setStyle(css) {
+        var sheet = document.getElementById('remarkable-style');
+        if (sheet === null) {
+            sheet = document.createElement('style');
+            sheet.id = 'remarkable-style';
+            document.head.appendChild(sheet);
+        }
+        sheet.textContent = css;
+        measure();
+        return true;
+    }
+
+    // Images, MathJax, zoom and style changes all move the blocks around
+    window.addEventListener('scroll', onScroll);
+    window.addEventListener('resize', measure);
+    document.addEventListener('load', measure, true);
+    if (window.ResizeObserver) {
+        new ResizeObserver(measure).observe(document.body);
+    }
+    measure();
+
+    // Cache the formulas of the loaded page once MathJax has typeset them
+    var loaded = document.getElementsByTagName('mathjax');
+    for (var i = 0; i < loaded.length; i++) {
+        loaded[i].remarkableFormula = formulaKey(loaded[i]);
+    }
+    if (window.MathJax && MathJax.Hub) {
+        MathJax.Hub.Queue(rememberAll);
+    } else if (window.MathJax) {
+        var authorInit = MathJax.AuthorInit;
+        MathJax.AuthorInit = function () {
+            if (authorInit) {
+                authorInit();
+            }
+            MathJax.Hub.Register.StartupHook('End', rememberAll);
+        };
+    }
+
+    return { patch: patch, setStyle: setStyle, scrollTo: scrollTo };
+})();
@@ -30,16 +30,24 @@ from bs4 import BeautifulSoup
 from gi.repository import Gdk, Gtk, GtkSource, Pango, WebKit2
 from locale import gettext as _
 from urllib.request import urlopen
-import markdown
 import os
 import pdfkit
 import re, subprocess, datetime, os, webbrowser, _thread, sys, locale
 import tempfile
 import traceback
 import styles
+import assets
 import unicodedata
 import warnings
 from findBar import FindBar
+from scheduler import PreviewScheduler
+from worker import RenderWorker
+from livePreview import LivePreview
+from previewContent import PreviewContent
+from pipeline import RenderPipeline
+from renderProcess import RenderProcess
+from changeTracker import ChangeTracker
+from textStatistics import Statistics
 
 # Check if gtkspellcheck is installed
 try:
@@ -63,12 +71,18 @@ from remarkable.markdown.extensions.Checklist import Checklist
 from remarkable.markdown.extensions.Superscript import Superscript
 from remarkable.markdown.extensions.Subscript import Subscript
 from remarkable.markdown.extensions.AutoLink import AutoLink
-from remarkable.markdown.extensions.MathJax import MathJax
+from remarkable.markdown.extensions.MathJax import MathJax, latex_to_mathml
+from remarkable.markdown.extensions.CodeHighlight import CodeHighlight
 
 from remarkable.AboutRemarkableDialog import AboutRemarkableDialog
 
 app_version = 1.95 # Remarkable app version
 
+# Math is typeset by MathJax in the page, or converted to MathML while rendering
+MATHJAX = 'remarkable.markdown.extensions.MathJax:MathJax'
+MATHML = 'remarkable.markdown.extensions.MathJax:MathML'
+MATHJAX_HTML = '<script type="text/javascript" src="%s"></script><script type="text/javascript">MathJax.Hub.Config({"showProcessingMessages" : false,"messageStyle" : "none","tex2jax": { inlineMath: [ [ "$", "$" ] ] }});</script>'
+
 class RemarkableWindow(Window):
     __gtype_name__ = "RemarkableWindow"
     
@@ -89,10 +103,12 @@ class RemarkableWindow(Window):
         self.media_path = remarkableconfig.get_data_path() + os.path.sep + "media" + os.path.sep
         self.name = "Untitled" # Title of the current file, set to 'Untitled' as default
 
-        self.default_html_start = '<!doctype HTML><html><head><meta charset="utf-8"><title>Made with Remarkable!</title><link rel="stylesheet" href="' + self.media_path + 'highlightjs.default.min.css">'
+        self.default_html_start = '<!doctype HTML><html><head><meta charset="utf-8"><title>Made with Remarkable!</title><link rel="stylesheet" href="' + self.media_path + 'highlightjs.default.min.css"><link rel="stylesheet" href="' + self.media_path + assets.FONTS_CSS + '">'
         self.default_html_start += "<style type='text/css'>" + styles.get() + "</style>"
         self.default_html_start += "</head><body id='MathPreviewF'>"
-        self.default_html_end = '<script src="' + self.media_path + 'highlight.min.js"></script><script>hljs.initHighlightingOnLoad();</script><script type="text/javascript" src="https://cdnjs.cloudflare.com/ajax/libs/mathjax/2.7.2/MathJax.js?config=TeX-AMS-MML_HTMLorMML"></script><script type="text/javascript">MathJax.Hub.Config({"showProcessingMessages" : false,"messageStyle" : "none","tex2jax": { inlineMath: [ [ "$", "$" ] ] }});</script></body></html>'
+        self.mathjax_html = MATHJAX_HTML % assets.mathjax_url(self.media_path)
+        self.default_html_end = '<script src="' + self.media_path + 'highlight.min.js"></script><script>' + assets.HIGHLIGHT_JS + '</script>' + self.mathjax_html + '</body></html>'
+        self.mathml = False # Set by use_mathml()
         self.remarkable_settings = {}
 
         self.default_extensions = ['markdown.extensions.extra']
@@ -104,10 +120,15 @@ class RemarkableWindow(Window):
         self.default_extensions += ['remarkable.markdown.extensions.Checklist:Checklist']
         self.default_extensions += ['remarkable.markdown.extensions.Superscript:Superscript']
         self.default_extensions += ['remarkable.markdown.extensions.Subscript:Subscript']
-        self.default_extensions += ['remarkable.markdown.extensions.MathJax:MathJax']
+        self.default_extensions += ['remarkable.markdown.extensions.CodeHighlight:CodeHighlight']
+        self.default_extensions += [MATHJAX]
 
 
-        self.safe_extensions = ['markdown.extensions.extra']
+        # Running with -v compares every incremental preview render against a full one
+        # Big documents are rendered in a separate process, see 'render-process-size'
+        self.render_process = RenderProcess(self.default_extensions)
+        self.pipeline = RenderPipeline(self.default_extensions, verify=logger.isEnabledFor(logging.DEBUG),
+                                       process=self.render_process)
         self.pdf_error_warning = False
 
         self.window = self.builder.get_object("remarkable_window")
@@ -128,12 +149,25 @@ class RemarkableWindow(Window):
         self.undo_manager.connect("can-undo-changed", self.can_undo_changed)
         self.undo_manager.connect("can-redo-changed", self.can_redo_changed)
 
+        # Records edit ranges and shares one copy of the text between consumers
+        self.change_tracker = ChangeTracker(self.text_buffer)
+        self.statistics = Statistics(self.change_tracker)
+        self.status_selection = False
+        # Bulk edits notify once, when their transaction commits
+        self.change_tracker.observe(lambda: self.on_text_view_changed(self.text_buffer))
+        self.preview_scheduler = PreviewScheduler(self.render_scheduled_preview)
+        self.render_worker = RenderWorker(self.render_preview_html, self.on_live_preview_rendered)
         self.text_buffer.connect("changed", self.on_text_view_changed)
+        self.text_buffer.connect("mark-set", self.on_text_buffer_mark_set)
         self.text_view.set_buffer(self.text_buffer)
         self.text_view.set_wrap_mode(Gtk.WrapMode.WORD)
         self.text_view.connect('key-press-event', self.cursor_ctrl_arrow_rtl_fix)
 
-        self.live_preview = WebKit2.WebView()
+        # Scripts are injected by WebKit, the preview page only carries the style sheet and body
+        self.preview_content = PreviewContent(self.media_path)
+        self.live_preview = WebKit2.WebView.new_with_user_content_manager(self.preview_content.manager)
+        self.preview = LivePreview(self.live_preview, self.scrollEditorTo, self.scrollPreviewTo)
+        self.preview.set_style(styles.get())
 
         self.scrolledwindow_text_view = Gtk.ScrolledWindow()
         self.scrolledwindow_text_view.add(self.text_view)
@@ -168,7 +202,7 @@ class RemarkableWindow(Window):
         regex = self.builder.get_object("regex")
         findbar = self.builder.get_object('findbar')
         self.findbar = FindBar(findbar, self.wrap_box, self.find_entry, self.replace_entry,
-                               match_case, whole_word, regex)
+                               match_case, whole_word, regex, self.change_tracker.transaction)
         self.findbar.set_text_view(self.text_view)
 
         # Check if filename has been specified in terminal command
@@ -198,9 +232,10 @@ class RemarkableWindow(Window):
             except:
                 pass # Spell checking not enabled
 
+        # Scroll positions are synchronised once per frame in either direction
+        self.scroll_tick = None
+        self.syncing_editor = False
         self.tv_scrolled = self.scrolledwindow_text_view.get_vadjustment().connect("value-changed", self.scrollPreviewTo)
-        self.lp_scrolled_fix = self.scrolledwindow_live_preview.get_vadjustment().connect("value-changed", self.scrollPreviewToFix)
-        self.scrolledwindow_live_preview.get_vadjustment().set_lower(1)
 
         self.temp_file_list = []
 
@@ -256,6 +291,9 @@ class RemarkableWindow(Window):
             self.remarkable_settings['word-wrap'] = True
             self.remarkable_settings['zoom-level'] = 1
             self.remarkable_settings['rtl'] = False
+            self.remarkable_settings['render-cache-size'] = 32
+            self.remarkable_settings['render-process-size'] = 128
+            self.remarkable_settings['mathml'] = False
             settings_file = open(self.settings_path, 'w')
             settings_file.write(str(self.remarkable_settings))
             settings_file.close()
@@ -312,6 +350,22 @@ class RemarkableWindow(Window):
             # Switch to vertical layout
             self.builder.get_object("menuitem_vertical_layout").set_active(True)
 
+        if "render-cache-size" not in self.remarkable_settings:
+            self.remarkable_settings['render-cache-size'] = 32 # MB
+
+        self.pipeline.cache.set_budget(self.remarkable_settings['render-cache-size'] * 1024 * 1024)
+
+        if "render-process-size" not in self.remarkable_settings:
+            self.remarkable_settings['render-process-size'] = 128 # KB, 0 renders everything in-process
+
+        self.pipeline.process_size = self.remarkable_settings['render-process-size'] * 1024
+
+        if "mathml" not in self.remarkable_settings:
+            self.remarkable_settings['mathml'] = False # Needs latex2mathml
+
+        if self.remarkable_settings['mathml']:
+            self.use_mathml()
+
         if 'zoom-level' in self.remarkable_settings:
             self.live_preview.set_zoom_level(self.remarkable_settings['zoom-level'])
 
@@ -360,24 +414,56 @@ class RemarkableWindow(Window):
         except:
             print("Couldn't choose previously selected style")
 
-    def scrollPreviewToFix(self, widget):
-        self.scrolledwindow_live_preview.get_vadjustment().disconnect(self.lp_scrolled_fix)
-        value = self.scrolledwindow_live_preview.get_vadjustment().get_value()
-        if value == 0: # Fix
-            self.scrollPreviewTo(self)
-        else:
-            pass # Something better?
-
-    def scrollPreviewTo(self, widget):
-        self.scrolledwindow_live_preview.get_vadjustment().disconnect(self.lp_scrolled_fix)
-        value = self.scrolledwindow_text_view.get_vadjustment().get_value()
-        upper_edit = self.scrolledwindow_text_view.get_vadjustment().get_upper()
-        preview_upper = self.scrolledwindow_live_preview.get_vadjustment().get_upper()
-        if value >= upper_edit - self.scrolledwindow_text_view.get_vadjustment().get_page_size():
-            self.scrolledwindow_live_preview.get_vadjustment().set_value(preview_upper - self.scrolledwindow_live_preview.get_vadjustment().get_page_size())
+    def use_mathml(self):
+        """
+            Convert math to MathML while rendering. MathJax is then only
+            needed for the formulas latex2mathml cannot convert.
+        """
+        if latex_to_mathml is None:
+            logger.warning("The mathml setting needs latex2mathml, math is typeset by MathJax")
+            return
+        self.mathml = True
+        self.default_extensions = [MATHML if extension == MATHJAX else extension
+                                   for extension in self.default_extensions]
+        self.pipeline.set_extensions(self.default_extensions)
+        self.render_worker.invalidate()
+        # Pages only load MathJax for TeX that is left, see render_page()
+        self.default_html_end = self.default_html_end.replace(self.mathjax_html, '')
+        self.mathjax_html = MATHJAX_HTML % assets.mathjax_url(self.media_path, assets.MATHJAX_TEX_CONFIG)
+        self.preview_content.set_mathml(True)
+        self.preview.reload()
+        self.update_live_preview(self)
+
+    def scrollPreviewTo(self, widget=None):
+        if self.syncing_editor or self.scroll_tick is not None:
+            return
+        self.scroll_tick = self.text_view.add_tick_callback(self.on_scroll_tick)
+
+    def on_scroll_tick(self, widget, frame_clock):
+        self.scroll_tick = None
+        adjustment = self.scrolledwindow_text_view.get_vadjustment()
+        value = adjustment.get_value()
+        if value > 0 and value >= adjustment.get_upper() - adjustment.get_page_size():
+            offset = self.preview.height  # Keep the ends of both panes together
         else:
-            self.scrolledwindow_live_preview.get_vadjustment().set_value(value / upper_edit * preview_upper)
-        self.lp_scrolled_fix = self.scrolledwindow_live_preview.get_vadjustment().connect("value-changed", self.scrollPreviewToFix)
+            # Top line of the editor, including how far it is scrolled into that line
+            line_iter, line_top = self.text_view.get_line_at_y(value)
+            line_height = self.text_view.get_line_yrange(line_iter)[1]
+            fraction = (value - line_top) / line_height if line_height else 0
+            offset = self.preview.line_to_offset(line_iter.get_line() + fraction)
+        if offset is not None:
+            self.preview.scroll_to(offset)
+        return False
+
+    def scrollEditorTo(self, line):
+        adjustment = self.scrolledwindow_text_view.get_vadjustment()
+        line_iter = self.text_buffer.get_iter_at_line(int(line))
+        line_top, line_height = self.text_view.get_line_yrange(line_iter)
+        # The editor follows the preview without echoing the position back
+        self.syncing_editor = True
+        adjustment.set_value(min(line_top + (line - int(line)) * line_height,
+                                 adjustment.get_upper() - adjustment.get_page_size()))
+        self.syncing_editor = False
 
     def on_menuitem_numbered_list_activate(self, widget):
         if self.text_buffer.get_has_selection():
@@ -385,11 +471,12 @@ class RemarkableWindow(Window):
             start_line = start.get_line()
             end_line = end.get_line()
             i = 1
-            while (start_line <= end_line):
-                temp_iter = self.text_buffer.get_iter_at_line(start_line)
-                self.text_buffer.insert(temp_iter, str(i) + ". ")
-                start_line += 1
-                i += 1
+            with self.change_tracker.transaction():
+                while (start_line <= end_line):
+                    temp_iter = self.text_buffer.get_iter_at_line(start_line)
+                    self.text_buffer.insert(temp_iter, str(i) + ". ")
+                    start_line += 1
+                    i += 1
         else:
             temp_iter = self.text_buffer.get_iter_at_mark(self.text_buffer.get_insert())
             line_number = temp_iter.get_line()
@@ -418,8 +505,7 @@ class RemarkableWindow(Window):
         Opens a file for editing / viewing
     """
     def open(self, widget):
-        start, end = self.text_buffer.get_bounds()
-        text = self.text_buffer.get_text(start, end, False)
+        text = self.change_tracker.text()
         
         self.window.set_sensitive(False)
         chooser = Gtk.FileChooserDialog(title="Open File", action=Gtk.FileChooserAction.OPEN, buttons=(
@@ -482,7 +568,7 @@ class RemarkableWindow(Window):
     def save(self, widget):
         if self.name != "Untitled":
             file = open(self.name, 'w')
-            text = self.text_buffer.get_text(self.text_buffer.get_start_iter(), self.text_buffer.get_end_iter(), False)
+            text = self.change_tracker.text()
             file.write(text)
             file.close()
             title = self.name.split("/")[-1]
@@ -510,7 +596,7 @@ class RemarkableWindow(Window):
         if response == Gtk.ResponseType.OK:
             file = open(chooser.get_filename(), 'w')
             self.name = chooser.get_filename()
-            text = self.text_buffer.get_text(self.text_buffer.get_start_iter(), self.text_buffer.get_end_iter(), False)
+            text = self.change_tracker.text()
             file.write(text)
             file.close()
             self.text_buffer.set_modified(False)
@@ -533,37 +619,18 @@ class RemarkableWindow(Window):
 
         styles.rtl(enabled)
         self.update_style(self)
-        self.update_live_preview(self)
 
     def on_menuitem_export_html_activate(self, widget):
         self.window.set_sensitive(False)
-        start, end = self.text_buffer.get_bounds()
-        text = self.text_buffer.get_text(start, end, False)
-        text = self.text_buffer.get_text(self.text_buffer.get_start_iter(), self.text_buffer.get_end_iter(), False)
-        try:
-            html_middle = markdown.markdown(text, self.default_extensions)
-        except:
-            try:
-                html_middle = markdown.markdown(text, extensions =self.safe_extensions)
-            except:
-                html_middle = markdown.markdown(text)
-        html = self.default_html_start + html_middle + self.default_html_end
+        text = self.change_tracker.text()
+        html = self.render_page(text)
         self.save_html(html)
 
     def on_menuitem_export_html_plain_activate(self, widget):
         # This can be re-factored. A lot of duplicated code. Migrate some functions to external .py files
         self.window.set_sensitive(False)
-        start, end = self.text_buffer.get_bounds()
-        text = self.text_buffer.get_text(start, end, False)
-        text = self.text_buffer.get_text(self.text_buffer.get_start_iter(), self.text_buffer.get_end_iter(), False)
-        try:
-            html_middle = markdown.markdown(text, self.default_extensions)
-        except:
-            try:
-                html_middle = markdown.markdown(text, extensions =self.safe_extensions)
-            except:
-                html_middle = markdown.markdown(text)
-        html = html_middle
+        text = self.change_tracker.text()
+        html = self.render_body(text)
         self.save_html(html)
 
     def save_html(self, data):
@@ -595,36 +662,24 @@ class RemarkableWindow(Window):
 
     def on_menuitem_export_pdf_activate(self, widget):
         self.window.set_sensitive(False)
-        start, end = self.text_buffer.get_bounds()
-        text = self.text_buffer.get_text(start, end, False)
-        text = self.text_buffer.get_text(self.text_buffer.get_start_iter(), self.text_buffer.get_end_iter(), False)
+        text = self.change_tracker.text()
         dirname = os.path.dirname(self.name)
         text = re.sub(r'(\!\[.*?\]\()([^/][^:]*?\))', lambda m, dirname=dirname: m.group(1) + os.path.join(dirname, m.group(2)), text)
-        try:
-            html_middle = markdown.markdown(text, self.default_extensions)
-        except:
-            try:
-                html_middle = markdown.markdown(text, self.safe_extensions)
-            except:
-                html_middle = markdown.markdown(text)
-        html = self.default_html_start + html_middle + self.default_html_end
+        html = self.render_page(text)
         self.save_pdf(html)
 
     def on_menuitem_export_pdf_plain_activate(self, widget):
         self.window.set_sensitive(False)
-        start, end = self.text_buffer.get_bounds()
-        text = self.text_buffer.get_text(start, end, False)
-        text = self.text_buffer.get_text(self.text_buffer.get_start_iter(), self.text_buffer.get_end_iter(), False)
-        try:
-            html_middle = markdown.markdown(text, self.default_extensions)
-        except:
-            try:
-                html_middle = markdown.markdown(text, self.safe_extensions)
-            except:
-                html_middle = markdown.markdown(text)
-        html = html_middle
+        text = self.change_tracker.text()
+        html = self.render_body(text)
         self.save_pdf(html)
         
+    def pdf_javascript_delay(self, html):
+        """ Milliseconds wkhtmltopdf waits for scripts to finish before printing """
+        if self.mathml and self.mathjax_html not in html:
+            return '0' # Nothing left to typeset
+        return '1000' # Time for MathJax to typeset, a local copy does not make that faster
+
     def save_pdf(self, html):
         chooser = Gtk.FileChooserDialog("Export PDF", None, Gtk.FileChooserAction.SAVE,
                                         (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
@@ -647,7 +702,7 @@ class RemarkableWindow(Window):
                     'margin-bottom': '0.75in',
                     'margin-left': '0.75in',
                     'encoding': "UTF-8",
-                    'javascript-delay' : '1000',
+                    'javascript-delay' : self.pdf_javascript_delay(html),
                     'enable-local-file-access': None,
                     'no-outline': None})
             except:
@@ -680,8 +735,7 @@ class RemarkableWindow(Window):
         self.window_delete_event(self)
 
     def window_delete_event(self, widget, callback=None):
-        start, end = self.text_buffer.get_bounds()
-        text = self.text_buffer.get_text(start, end, False)
+        text = self.change_tracker.text()
 
         safe_to_quit = True # Keep track if user cancelled save operation
 
@@ -718,13 +772,11 @@ class RemarkableWindow(Window):
         self.live_preview.set_zoom_level((1+self.zoom_steps)*self.live_preview.get_zoom_level())
         self.remarkable_settings['zoom-level'] = self.live_preview.get_zoom_level()
         self.write_settings()
-        self.scrollPreviewToFix(self)
 
     def zoom_out(self):
         self.live_preview.set_zoom_level((1-self.zoom_steps)*self.live_preview.get_zoom_level())
         self.remarkable_settings['zoom-level'] = self.live_preview.get_zoom_level()
         self.write_settings()
-        self.scrollPreviewToFix(self)
 
     def on_toolbutton_zoom_in_clicked(self, widget):
         self.zoom_in()
@@ -793,75 +845,71 @@ class RemarkableWindow(Window):
             start, end = self.text_buffer.get_selection_bounds()
             text = self.text_buffer.get_text(start, end, True)
             text = text.lower()
-            self.text_buffer.delete(start, end)
-            self.text_buffer.insert_at_cursor(text)
+            with self.change_tracker.transaction():
+                self.text_buffer.delete(start, end)
+                self.text_buffer.insert_at_cursor(text)
 
     def on_menuitem_title_activate(self, widget):
         if self.text_buffer.get_has_selection():
             start, end = self.text_buffer.get_selection_bounds()
             text = self.text_buffer.get_text(start, end, True)
             text = text.title()
-            self.text_buffer.delete(start, end)
-            self.text_buffer.insert_at_cursor(text)
+            with self.change_tracker.transaction():
+                self.text_buffer.delete(start, end)
+                self.text_buffer.insert_at_cursor(text)
 
     def on_menuitem_upper_activate(self, widget):
         if self.text_buffer.get_has_selection():
             start, end = self.text_buffer.get_selection_bounds()
             text = self.text_buffer.get_text(start, end, True)
             text = text.upper()
-            self.text_buffer.delete(start, end)
-            self.text_buffer.insert_at_cursor(text)
+            with self.change_tracker.transaction():
+                self.text_buffer.delete(start, end)
+                self.text_buffer.insert_at_cursor(text)
             
     def on_menuitem_join_lines_activate(self, widget):
         if self.text_buffer.get_has_selection():
             start, end = self.text_buffer.get_selection_bounds()
-            self.text_buffer.join_lines(start, end)
+            with self.change_tracker.transaction():
+                self.text_buffer.join_lines(start, end)
         
     def on_menuitem_sort_lines_activate(self, widget):
         if self.text_buffer.get_has_selection():
             # Sort the selected lines
             start, end = self.text_buffer.get_selection_bounds()
-            self.text_buffer.sort_lines(start, end, GtkSource.SortFlags.CASE_SENSITIVE, 0)
+            with self.change_tracker.transaction():
+                self.text_buffer.sort_lines(start, end, GtkSource.SortFlags.CASE_SENSITIVE, 0)
         else:
             # No selection active, sort all lines
             start, end = self.text_buffer.get_bounds()
-            self.text_buffer.sort_lines(start, end, GtkSource.SortFlags.CASE_SENSITIVE, 0)
+            with self.change_tracker.transaction():
+                self.text_buffer.sort_lines(start, end, GtkSource.SortFlags.CASE_SENSITIVE, 0)
 
     def on_menuitem_sort_lines_reverse_activate(self, widget):
         if self.text_buffer.get_has_selection():
             # Sort the selected lines in reverse
             start, end = self.text_buffer.get_selection_bounds()
-            self.text_buffer.sort_lines(start, end, GtkSource.SortFlags.REVERSE_ORDER, 0)
+            with self.change_tracker.transaction():
+                self.text_buffer.sort_lines(start, end, GtkSource.SortFlags.REVERSE_ORDER, 0)
         else:
             # No selection active, sort all lines in reverse
             start, end = self.text_buffer.get_bounds()
-            self.text_buffer.sort_lines(start, end, GtkSource.SortFlags.REVERSE_ORDER, 0)
+            with self.change_tracker.transaction():
+                self.text_buffer.sort_lines(start, end, GtkSource.SortFlags.REVERSE_ORDER, 0)
     
     # Copy all text from the editor pane and format it as HTML in the clipboard
     def on_menuitem_copy_all_activate(self, widget):
-        text = self.text_buffer.get_text(self.text_buffer.get_start_iter(), self.text_buffer.get_end_iter(), False)
-        try:
-            text = markdown.markdown(text, self.default_extensions)
-        except:
-            try:
-                html_middle = markdown.markdown(text, extensions = self.safe_extensions)
-            except:
-                html_middle = markdown.markdown(text)
-        self.clipboard.set_text(text, -1)
+        text = self.change_tracker.text()
+        html = self.render_body(text)
+        self.clipboard.set_text(html, -1)
 
     # Copy selected text from the editor pane and format as HTML in the clipboard
     def on_menuitem_copy_selection_activate(self, widget):
         if self.text_buffer.get_has_selection():
             start, end = self.text_buffer.get_selection_bounds()
             text = self.text_buffer.get_text(start, end, True)
-            try:
-                text = markdown.markdown(text, self.default_extensions)
-            except:
-                try:
-                    html_middle = markdown.markdown(text, extensions =self.safe_extensions)
-                except:
-                    html_middle = markdown.markdown(text)
-            self.clipboard.set_text(text, -1)
+            html = self.render_body(text)
+            self.clipboard.set_text(html, -1)
 
     def on_menuitem_vertical_layout_activate(self, widget):
         if self.builder.get_object("menuitem_vertical_layout").get_active():
@@ -1005,17 +1053,10 @@ class RemarkableWindow(Window):
         self.temp_file_list.append(tf)
         tf_name = tf.name
 
-        text = self.text_buffer.get_text(self.text_buffer.get_start_iter(), self.text_buffer.get_end_iter(), False)
+        text = self.change_tracker.text()
         dirname = os.path.dirname(self.name)
         text = re.sub(r'(\!\[.*?\]\()([^/][^:]*?\))', lambda m, dirname=dirname: m.group(1) + os.path.join(dirname, m.group(2)), text)
-        try:
-            html_middle = markdown.markdown(text, self.default_extensions)
-        except:
-            try:
-                html_middle = markdown.markdown(text, extensions =self.safe_extensions)
-            except:
-                html_middle = markdown.markdown(text)
-        html = self.default_html_start + html_middle + self.default_html_end
+        html = self.render_page(text)
         tf.write(html.encode())
         tf.flush()
         
@@ -1411,87 +1452,51 @@ class RemarkableWindow(Window):
 
     # Styles
     def update_style(self, widget):
-        self.default_html_start = '<!doctype HTML><html><head><meta charset="utf-8"><title>Made with Remarkable!</title><link rel="stylesheet" href="' + self.media_path + 'highlightjs.default.min.css">'
+        self.default_html_start = '<!doctype HTML><html><head><meta charset="utf-8"><title>Made with Remarkable!</title><link rel="stylesheet" href="' + self.media_path + 'highlightjs.default.min.css"><link rel="stylesheet" href="' + self.media_path + assets.FONTS_CSS + '">'
         self.default_html_start += "<style type='text/css'>" + styles.get() + "</style>"
         self.default_html_start += "</head><body>"
+        # Swapped in the loaded page, no Markdown is re-run
+        self.preview.set_style(styles.get())
 
-    def on_menuitem_dark_activate(self, widget):
-        styles.set(styles.dark)
+    def set_style(self, css, name):
+        styles.set(css)
         self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "dark"
+        self.remarkable_settings['style'] = name
         self.write_settings()
 
+    def on_menuitem_dark_activate(self, widget):
+        self.set_style(styles.dark, "dark")
+
     def on_menuitem_foghorn_activate(self, widget):
-        styles.set(styles.foghorn)
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "foghorn"
-        self.write_settings()
+        self.set_style(styles.foghorn, "foghorn")
 
     def on_menuitem_github_activate(self, widget):
-        styles.set(styles.github)
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "github"
-        self.write_settings()
+        self.set_style(styles.github, "github")
 
     def on_menuitem_handwritten_activate(self, widget):
-        styles.set(styles.handwriting_css)
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "handwriting_css"
-        self.write_settings()
+        self.set_style(styles.handwriting_css, "handwriting_css")
 
     def on_menuitem_markdown_activate(self, widget):
-        styles.set(styles.markdown)
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "markdown"
-        self.write_settings()
+        self.set_style(styles.markdown, "markdown")
 
     def on_menuitem_metro_vibes_activate(self, widget):
-        styles.set(styles.metro_vibes)
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "metro_vibes"
-        self.write_settings()
+        self.set_style(styles.metro_vibes, "metro_vibes")
 
     def on_menuitem_metro_vibes_dark_activate(self, widget):
-        styles.set(styles.metro_vibes_dark)
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "metro_vibes_dark"
-        self.write_settings()
+        self.set_style(styles.metro_vibes_dark, "metro_vibes_dark")
 
 
     def on_menuitem_modern_activate(self, widget):
-        styles.set(styles.modern_css)
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "modern_css"
-        self.write_settings()
+        self.set_style(styles.modern_css, "modern_css")
 
     def on_menuitem_screen_activate(self, widget):
-        styles.set(styles.screen)
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "screen"
-        self.write_settings()
+        self.set_style(styles.screen, "screen")
     
     def on_menuitem_solarized_dark_activate(self, widget):
-        styles.set(styles.solarized_dark)
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "solarized_dark"
-        self.write_settings()
+        self.set_style(styles.solarized_dark, "solarized_dark")
 
     def on_menuitem_solarized_light_activate(self, widget):
-        styles.set(styles.solarized_light)
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "solarized_light"
-        self.write_settings()
+        self.set_style(styles.solarized_light, "solarized_light")
 
     # Custom CSS
     def on_menuitem_custom_activate(self, widget):
@@ -1517,13 +1522,9 @@ class RemarkableWindow(Window):
     def apply_custom_css(self, widget, window, tb):
         start, end = tb.get_bounds()
         self.custom_css = tb.get_text(start, end, False).replace("'", '"')
-        styles.set(self.custom_css)
-        self.remarkable_settings['css'] = styles.get()
+        self.remarkable_settings['css'] = self.custom_css
         window.hide()
-        self.update_style(self)
-        self.update_live_preview(self)
-        self.remarkable_settings['style'] = "custom"
-        self.write_settings()
+        self.set_style(self.custom_css, "custom")
     ## End Custom CSS
 
     def on_menuitem_github_page_activate(self, widget):
@@ -1574,15 +1575,15 @@ class RemarkableWindow(Window):
     #         print("Warning: Remarkable could not connect to the internet to check for updates")
 
     def on_text_view_changed(self, widget):
-        start, end = self.text_buffer.get_bounds()
-        
+        if self.change_tracker.in_transaction:
+            return
         if self.statusbar.get_visible():
             self.update_status_bar(self)
         else:  # statusbar not present, don't need to update/count words, etc.
             pass
         if self.live_preview.get_visible():
-            self.update_live_preview(self)
-            self.scrollPreviewTo(self)
+            # Coalesce bursts of edits into a single render
+            self.preview_scheduler.request()
 
         else:  # Live preview not enabled, don't need to update the view
             pass
@@ -1594,6 +1595,10 @@ class RemarkableWindow(Window):
                 title = "*" + title
                 self.window.set_title(title)
 
+    def render_scheduled_preview(self):
+        if self.live_preview.get_visible():
+            self.update_live_preview(self)
+
     """
         GtkTextView simply does not seem to handle visual word
         movements correctly in bi-directional move.
@@ -1636,38 +1641,65 @@ class RemarkableWindow(Window):
 
     """
         Update the text in the status bar. Displays the number of lines,
-        words and characters. This approach is possible inefficient.
+        words and characters, the reading time and the size of the selection.
+        Words are counted incrementally, only the edited lines are recounted.
     """
     def update_status_bar(self, widget):
         self.statusbar.pop(self.context_id)
         lines = self.text_buffer.get_line_count()
         chars = self.text_buffer.get_char_count()
-        words = self.text_buffer.get_text(self.text_buffer.get_start_iter(), self.text_buffer.get_end_iter(), False).split()
-        word_count = 0
-        word_exceptions = ["#", "##", "###", "####", "#####", "######", "*", "**", "-", "+", "_", "/", "\\", "/", ":",
-                           ";", "@", "'", "~", "(", ")", "[", "]", "{", "}", "((", "))", "+-", "-+", "/=", ".", "|",
-                           "!", "!!", "!!!", "$", "", "%", "^", "&"]  # Exclude these from word count
-        for w in words:
-            if w not in word_exceptions:
-                if not re.match('^[0-9]{1,3}$', w):
-                    word_count += 1
+        word_count = self.statistics.update()
         self.status_message = "Lines: " + str(lines) + ", " + "Words: " + str(word_count) + ", Characters: " + str(chars)
+        self.status_message += ", Reading time: " + str(Statistics.reading_time(word_count)) + " min"
+        selection = self.statistics.selection()
+        if selection is not None:
+            self.status_message += " (Selected: " + str(selection[0]) + " words, " + str(selection[1]) + " characters)"
+        self.status_selection = selection is not None
         self.statusbar.push(self.context_id, self.status_message)
 
+    def on_text_buffer_mark_set(self, buffer, location, mark):
+        # Only the selection counts can change when the cursor moves
+        if mark != buffer.get_insert() and mark != buffer.get_selection_bound():
+            return
+        if self.change_tracker.in_transaction:
+            return
+        if self.statusbar.get_visible() and (self.status_selection or buffer.get_has_selection()):
+            self.update_status_bar(self)
+
     def update_live_preview(self, widet):
-        text = self.text_buffer.get_text(self.text_buffer.get_start_iter(), self.text_buffer.get_end_iter(), False)
-        try:
-            html_middle = markdown.markdown(text, extensions=self.default_extensions)
-        except Exception as e:
-            print(e)
-            try:
-                html_middle = markdown.markdown(text, extensions=self.safe_extensions)
-            except:
-                html_middle = markdown.markdown(text)
-        html = self.default_html_start + html_middle + self.default_html_end
+        # Hand the shared, immutable snapshot of the text to the render thread,
+        # along with the visible lines so huge documents can render those first
+        text = self.change_tracker.text()
+        self.render_worker.submit((text, self.get_visible_lines()))
+
+    def get_visible_lines(self):
+        adjustment = self.scrolledwindow_text_view.get_vadjustment()
+        top = self.text_view.get_line_at_y(adjustment.get_value())[0].get_line()
+        bottom = self.text_view.get_line_at_y(adjustment.get_value() + adjustment.get_page_size())[0].get_line()
+        return top, bottom
+
+    """
+        Runs on the render thread, must not touch any GTK widgets
+    """
+    def render_preview_html(self, snapshot):
+        text, viewport = snapshot
+        return self.pipeline.render_blocks(text, viewport)
+
+    def render_body(self, text):
+        return self.pipeline.render(text)
+
+    def render_page(self, text):
+        html_end = self.default_html_end
+        if self.mathml and '<mathjax' in self.render_body(text):
+            # Formulas latex2mathml could not convert are left to MathJax
+            html_end = self.mathjax_html + html_end
+        return self.pipeline.render_page(text, self.default_html_start, html_end, styles.rtl())
+
+    def on_live_preview_rendered(self, blocks, cost):
+        self.preview_scheduler.record(cost)
 
-        # Update the display, supporting relative paths to local images
-        self.live_preview.load_html(html, "file://{}".format(os.path.abspath(self.name)))
+        # Patch the loaded page, supporting relative paths to local images
+        self.preview.show(blocks, "file://{}".format(os.path.abspath(self.name)), self.text_buffer.get_line_count())
 
     """
         This function suppresses the messages from the WebKit (live preview) console
@@ -1680,6 +1712,11 @@ class RemarkableWindow(Window):
         This function deletes any temporary files that were created during execution
     """
     def clean_up(self):
+        logger.debug(self.pipeline.cache.stats())
+        logger.debug(self.preview_content.store.stats())
+        self.preview_scheduler.cancel()
+        self.render_worker.stop()
+        self.render_process.stop()
         i = len(self.temp_file_list) - 1
         while i >= 0:
             os.remove(self.temp_file_list[0].name)
@@ -0,0 +1,137 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import hashlib
+import logging
+import mimetypes
+import os
+from urllib.parse import unquote, urlsplit
+
+import gi
+from gi.repository import Gio, GLib, WebKit2
+
+try:
+    gi.require_version('Soup', '3.0')
+    from gi.repository import Soup
+except (ImportError, ValueError):
+    Soup = None
+
+logger = logging.getLogger('remarkable')
+
+
+class AssetStore(object):
+    """
+        Serves preview assets from memory under the remarkable:// URI scheme.
+
+        mount() maps remarkable://<host>/ onto a directory whose files are
+        read on first use and then served from memory, stored once per SHA-1
+        digest. Every response carries an ETag and a long-lived
+        Cache-Control header, so WebKit can reuse its copy across page
+        loads.
+    """
+
+    SCHEME = "remarkable"
+    CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+    def __init__(self):
+        self.blobs = {}  # digest -> bytes
+        self.entries = {}  # (host, path) -> (digest, mime type)
+        self.roots = {}  # host -> directory
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, context):
+        """ Serve this store's URLs in every web view of context """
+        context.register_uri_scheme(self.SCHEME, self.handle)
+        # Fonts are loaded with CORS from pages on other schemes
+        context.get_security_manager().register_uri_scheme_as_cors_enabled(self.SCHEME)
+
+    def mount(self, host, directory):
+        """ Serve the files in directory, returning the URL of its root """
+        self.roots[host] = os.path.realpath(directory)
+        return "%s://%s/" % (self.SCHEME, host)
+
+    def get(self, host, path):
+        """ The (data, mime type, digest) stored for a URL, or None """
+        entry = self.entries.get((host, path))
+        if entry is not None:
+            self.hits += 1
+        else:
+            entry = self._load(host, path)
+            if entry is None:
+                return None
+            self.misses += 1
+        digest, mime = entry
+        return self.blobs[digest], mime, digest
+
+    def get_text(self, host, path):
+        found = self.get(host, path)
+        return found[0].decode("utf-8") if found is not None else None
+
+    def _store(self, data):
+        digest = hashlib.sha1(data).hexdigest()
+        self.blobs.setdefault(digest, data)
+        return digest
+
+    def _load(self, host, path):
+        root = self.roots.get(host)
+        if root is None:
+            return None
+        full_path = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, full_path]) != root:
+            return None  # Outside of the mounted directory
+        try:
+            with open(full_path, "rb") as asset:
+                data = asset.read()
+        except OSError:
+            return None
+        mime = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        entry = (self._store(data), mime)
+        self.entries[(host, path)] = entry
+        return entry
+
+    def handle(self, request):
+        """ WebKit2.URISchemeRequest callback """
+        uri = urlsplit(request.get_uri())
+        found = self.get(uri.netloc, unquote(uri.path).lstrip("/"))
+        if found is None:
+            logger.debug("No preview asset for %s", request.get_uri())
+            request.finish_error(GLib.Error.new_literal(Gio.io_error_quark(), "Not found",
+                                                        Gio.IOErrorEnum.NOT_FOUND))
+            return
+        data, mime, digest = found
+        stream = Gio.MemoryInputStream.new_from_bytes(GLib.Bytes.new(data))
+        if Soup is None or not hasattr(WebKit2, "URISchemeResponse"):
+            request.finish(stream, len(data), mime)
+            return
+        response = WebKit2.URISchemeResponse.new(stream, len(data))
+        response.set_content_type(mime)
+        headers = Soup.MessageHeaders.new(Soup.MessageHeadersType.RESPONSE)
+        headers.append("Cache-Control", self.CACHE_CONTROL)
+        headers.append("ETag", '"%s"' % digest)
+        headers.append("Access-Control-Allow-Origin", "*")
+        response.set_http_headers(headers)
+        request.finish_with_response(response)
+
+    def stats(self):
+        return "Asset store: %d blobs, %d bytes, %d hits, %d misses" % (
+            len(self.blobs), sum(len(blob) for blob in self.blobs.values()), self.hits, self.misses)
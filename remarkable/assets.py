@@ -0,0 +1,66 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import logging
+import os
+
+logger = logging.getLogger('remarkable')
+
+MATHJAX_CONFIG = "TeX-AMS-MML_HTMLorMML"
+# TeX input only, for pages whose other formulas are MathML already
+MATHJAX_TEX_CONFIG = "TeX-AMS_HTML"
+MATHJAX_CDN = "https://cdnjs.cloudflare.com/ajax/libs/mathjax/2.7.2/MathJax.js"
+# Bundled copy first (relative to the media directory), then distribution packages
+MATHJAX_PATHS = ["mathjax",
+                 "/usr/share/javascript/mathjax",  # Debian, Ubuntu: libjs-mathjax
+                 "/usr/share/mathjax"]  # Fedora, Arch: mathjax
+FONTS_CSS = "fonts.css"
+# Highlights the code blocks that were not highlighted while rendering
+HIGHLIGHT_JS = ("(function () { var blocks = document.querySelectorAll('pre code:not(.hljs)');"
+                " for (var i = 0; i < blocks.length; i++) { hljs.highlightBlock(blocks[i]); } })();")
+
+
+def find_mathjax(media_path):
+    """ Path of a local MathJax.js, or None if MathJax is not installed """
+    for directory in MATHJAX_PATHS:
+        path = os.path.join(media_path, directory, "MathJax.js")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def mathjax_url(media_path, config=MATHJAX_CONFIG):
+    """ URL to load MathJax from, the network is only used without a local copy """
+    path = find_mathjax(media_path)
+    if path is None:
+        logger.warning("MathJax is not installed, loading it from %s", MATHJAX_CDN)
+        return MATHJAX_CDN + "?config=" + config
+    return "file://" + path + "?config=" + config
+
+
+def fonts_css(media_path):
+    """ The @font-face rules for the installed fonts the styles use """
+    try:
+        with open(os.path.join(media_path, FONTS_CSS), encoding="utf-8") as css:
+            return css.read()
+    except OSError:
+        return ""
@@ -0,0 +1,154 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import collections
+import contextlib
+
+Change = collections.namedtuple('Change', 'version offset removed added line lines_removed lines_added')
+
+
+def _shift(first, last, start, removed, added):
+    # Map a (first, last) range across an edit that replaced removed units at
+    # start with added ones, and extend it to cover the edit itself
+    end = start + removed
+    delta = added - removed
+    if first > end:
+        first += delta
+    elif first > start:
+        first = start
+    if last > end:
+        last += delta
+    elif last > start:
+        last = start
+    return min(first, start), max(last, start + added)
+
+
+class ChangeTracker(object):
+    """
+        Records what changed in a Gtk.TextBuffer and shares one copy of its text.
+
+        Every insert-text and delete-range is recorded as a Change and bumps
+        the version. Consumers remember the version they last processed and
+        ask for the dirty lines or offsets since then, so they can update
+        incrementally. text() copies the buffer at most once per version, all
+        consumers in the same batch of edits share that snapshot.
+
+        Bulk edits run inside transaction(). While one is open, in_transaction
+        tells "changed" handlers to do nothing; when it commits, the callbacks
+        passed to observe() run once if anything changed.
+    """
+
+    MAX_CHANGES = 1024
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.version = 0
+        self.changes = collections.deque(maxlen=self.MAX_CHANGES)
+        self.snapshot = None
+        self.snapshot_version = -1
+        self.depth = 0  # Nesting of open transactions
+        self.observers = []
+        # Connected before the default handlers, while the iters still point
+        # into the unmodified text
+        buffer.connect("insert-text", self.on_insert_text)
+        buffer.connect("delete-range", self.on_delete_range)
+
+    def on_insert_text(self, buffer, location, text, length):
+        self._record(location.get_offset(), 0, len(text), location.get_line(), 0, text.count('\n'))
+
+    def on_delete_range(self, buffer, start, end):
+        self._record(start.get_offset(), end.get_offset() - start.get_offset(),
+                     0, start.get_line(), end.get_line() - start.get_line(), 0)
+
+    @property
+    def in_transaction(self):
+        return self.depth > 0
+
+    def observe(self, callback):
+        """ Run callback() after every transaction that changed the buffer """
+        self.observers.append(callback)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """ Group the edits made in the block into one change and one undo step """
+        version = self.version
+        self.depth += 1
+        self.buffer.begin_user_action()
+        try:
+            yield self
+        finally:
+            self.buffer.end_user_action()
+            self.depth -= 1
+            if self.depth == 0 and self.version != version:
+                for callback in self.observers:
+                    callback()
+
+    def _record(self, offset, removed, added, line, lines_removed, lines_added):
+        self.version += 1
+        self.changes.append(Change(self.version, offset, removed, added, line, lines_removed, lines_added))
+
+    def text(self):
+        """ The whole text of the buffer, copied once per version """
+        if self.snapshot_version != self.version:
+            self.snapshot = self.buffer.get_text(self.buffer.get_start_iter(), self.buffer.get_end_iter(), False)
+            self.snapshot_version = self.version
+        return self.snapshot
+
+    def changes_since(self, version):
+        """ The changes made after version, or None if they are no longer known """
+        if version == self.version:
+            return []
+        if not self.changes or self.changes[0].version > version + 1:
+            return None
+        return [change for change in self.changes if change.version > version]
+
+    def dirty_lines(self, version):
+        """
+            The (first, last) range of current lines touched since version,
+            or None if nothing changed.
+        """
+        dirty = None
+        changes = self.changes_since(version)
+        if changes is None:
+            return 0, self.buffer.get_line_count() - 1
+        for change in changes:
+            if dirty is None:
+                dirty = (change.line, change.line + change.lines_added)
+            else:
+                dirty = _shift(dirty[0], dirty[1], change.line, change.lines_removed, change.lines_added)
+        return dirty
+
+    def dirty_offsets(self, version):
+        """
+            The (start, end) range of current character offsets touched since
+            version, or None if nothing changed.
+        """
+        dirty = None
+        changes = self.changes_since(version)
+        if changes is None:
+            return 0, self.buffer.get_char_count()
+        for change in changes:
+            if dirty is None:
+                dirty = (change.offset, change.offset + change.added)
+            else:
+                dirty = _shift(dirty[0], dirty[1], change.offset, change.removed, change.added)
+        return dirty
@@ -0,0 +1,74 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import threading
+
+import markdown
+
+
+class MarkdownEngine(object):
+    """
+        A Markdown instance that is built once for a set of extensions and
+        reset between conversions, instead of resolving, importing and
+        instantiating every extension again for each document.
+    """
+
+    def __init__(self, extensions=()):
+        self.extensions = tuple(extensions)
+        self.md = markdown.Markdown(extensions=list(self.extensions))
+        self.lock = threading.Lock()  # Shared by the render thread and the main loop
+
+    def convert(self, text):
+        with self.lock:
+            try:
+                return self.md.reset().convert(text)
+            finally:
+                self.md.reset()
+
+    def convert_with_references(self, text, references=None):
+        """
+            Convert text with extra link reference definitions available.
+            Returns the HTML and all references known after the conversion.
+        """
+        with self.lock:
+            try:
+                self.md.reset()
+                if references:
+                    self.md.references.update(references)
+                html = self.md.convert(text)
+                return html, dict(self.md.references)
+            finally:
+                self.md.reset()
+
+
+__engines = {}
+__lock = threading.Lock()
+
+def get(extensions=()):
+    """ Return the shared engine for this extension set, building it on first use """
+    key = tuple(extensions)
+    with __lock:
+        engine = __engines.get(key)
+        if engine is None:
+            engine = MarkdownEngine(key)
+            __engines[key] = engine
+        return engine
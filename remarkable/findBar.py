@@ -14,14 +14,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import contextlib
+
 from gi.repository import GtkSource # pylint: disable=E0611
 from gi.repository import Gdk
 
 
 class FindBar(object):
     def __init__(self, widget, wrap_box, find_entry, replace_entry,
-                 match_case, whole_word, regex):
+                 match_case, whole_word, regex, transaction=None):
         self.widget = widget
+        # Context manager factory wrapped around bulk replacements
+        self.transaction = transaction or contextlib.nullcontext
         self.set_text_view(None)
         self.wrap_box = wrap_box
         self.find_entry = find_entry
@@ -142,7 +146,8 @@ class FindBar(object):
         buf = self.textview.get_buffer()
         saved_insert = buf.create_mark(
             None, buf.get_iter_at_mark(buf.get_insert()), True)
-        self.search_context.replace_all(self.replace_entry.get_text(), -1)
+        with self.transaction():
+            self.search_context.replace_all(self.replace_entry.get_text(), -1)
         if not saved_insert.get_deleted():
             buf.place_cursor(buf.get_iter_at_mark(saved_insert))
             self.textview.scroll_to_mark(
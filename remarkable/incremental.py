@@ -0,0 +1,295 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import bisect
+import itertools
+import logging
+import re
+import time
+
+from markdown.extensions.fenced_code import FencedBlockPreprocessor
+
+logger = logging.getLogger('remarkable')
+
+# Constructs whose output depends on the whole document, render these in one go.
+# Python-Markdown only blanks whitespace lines after a newline, a leading one
+# can turn into a code block depending on what follows.
+FULL_RENDER_RE = re.compile(r'^[ ]{0,3}<|\*\[|\[\^|\[TOC\]|\A[ \t]+\n', re.MULTILINE)
+REFERENCE_RE = re.compile(r'\[[^\[\]]*\]:')
+LIST_RE = re.compile(r'^[ ]{0,3}(?:[*+-]|\d+\.)(?:[ \t]|$)', re.MULTILINE)
+QUOTE_RE = re.compile(r'^[ ]{0,3}>', re.MULTILINE)
+DEFINITION_RE = re.compile(r'^[ ]{0,3}:[ ]{1,3}', re.MULTILINE)
+HEADER_ID_RE = re.compile(r'<h[1-6][^>]* id="([^"]*)"')
+PLACEHOLDER = '<div class="remarkable-placeholder" style="height:%.1fem"></div>'
+
+
+def split_blocks(text):
+    """
+        Split Markdown source into top-level blocks that render independently.
+
+        Returns a list of (first line number, block text) tuples. Blocks are
+        separated by blank lines, except where the following block can change
+        the meaning of the previous one: fenced code spanning blank lines,
+        indented continuations (list items, code), sibling list items,
+        blockquotes and definition lists that Python-Markdown merges, and
+        definition list items.
+    """
+    # Blank lines inside fenced code never separate blocks
+    fenced = []
+    pos = 0
+    while True:
+        m = FencedBlockPreprocessor.FENCED_BLOCK_RE.search(text, pos)
+        if m is None:
+            break
+        fenced.append((m.start(), m.end()))
+        pos = m.end()
+
+    chunks = []  # [first line, start offset, end offset]
+    line_number = 0
+    offset = 0
+    fence = 0
+    current = None
+    for line in text.split('\n'):
+        while fence < len(fenced) and fenced[fence][1] <= offset:
+            fence += 1
+        in_fence = fence < len(fenced) and fenced[fence][0] <= offset
+        if not in_fence and not line.strip(' \t'):
+            current = None
+        else:
+            if current is None:
+                current = [line_number, offset, offset]
+                chunks.append(current)
+            current[2] = offset + len(line)
+        line_number += 1
+        offset += len(line) + 1
+
+    # Merged chunks keep the exact blank lines that separated them
+    blocks = []
+    for first_line, start, end in chunks:
+        chunk = text[start:end]
+        if blocks and _continues(blocks[-1][1], chunk):
+            blocks[-1][1] = text[blocks[-1][2]:end]
+            # What was added may tie the block to the one before, e.g. a definition
+            while len(blocks) > 1 and _continues(blocks[-2][1], blocks[-1][1]):
+                blocks[-2][1] = text[blocks[-2][2]:end]
+                del blocks[-1]
+        else:
+            blocks.append([first_line, chunk, start])
+    return [(first_line, block) for first_line, block, start in blocks]
+
+
+def _continues(previous, chunk):
+    first = chunk[0]
+    if first in ' \t:':
+        # Indented continuation or a definition for the previous term
+        return True
+    if REFERENCE_RE.search(chunk):
+        # Reference definitions leave no element behind, keep them with their neighbour
+        return True
+    if LIST_RE.match(chunk) and LIST_RE.search(previous):
+        return True
+    if QUOTE_RE.match(chunk) and QUOTE_RE.search(previous):
+        return True
+    if DEFINITION_RE.search(chunk) and DEFINITION_RE.search(previous):
+        # More terms and definitions for the definition list before
+        return True
+    return False
+
+
+class IncrementalRenderer(object):
+    """
+        Renders a document block by block, caching the HTML of each block.
+
+        After an edit only the blocks whose text changed are converted again.
+        Link reference definitions are collected from the whole document and
+        seeded into every block that could use them. Documents that use
+        constructs with document-wide effects (raw HTML blocks, footnotes,
+        abbreviations, [TOC] or repeated heading ids) are rendered in full.
+
+        With verify set, every result is compared against a full render and
+        the full render wins on any difference.
+    """
+
+    MAX_BUDGET = 1.0  # Seconds per progressive pass
+
+    def __init__(self, convert, verify=False):
+        self.convert = convert  # convert(text, references) -> (html, references)
+        self.verify = verify
+        self.cache = {}
+        self.blocks = []  # [(first line, html)] of the last render
+        self.complete = True  # False while placeholders stand in for some blocks
+        self.text = None
+        self.split = []
+        self.references = {}
+        self.signature = ()
+        self.results = []
+        self.pass_cache = {}
+        self.passes = 0
+
+    def render(self, text, viewport=None, budget=0.05):
+        """
+            Render text, returning the HTML body.
+
+            With a viewport of (first line, last line), only the blocks that
+            overlap it and whatever else fits in budget seconds are converted.
+            The remaining blocks are replaced by placeholders sized to their
+            line count and self.complete is cleared; call again with the same
+            text to fill in more of them.
+        """
+        html = self._render(text, viewport, budget)
+        if self.verify and self.complete:
+            expected = self.convert(text)[0]
+            if html != expected:
+                index = next((i for i, (a, b) in enumerate(zip(html, expected)) if a != b),
+                             min(len(html), len(expected)))
+                logger.warning("Incremental render differs from full render at offset %d: %r != %r",
+                               index, html[index:index + 40], expected[index:index + 40])
+                self.cache = {}
+                self.text = None
+                self.blocks = [(0, expected)]
+                return expected
+        return html
+
+    def _render(self, text, viewport, budget):
+        if FULL_RENDER_RE.search(text):
+            return self._render_full(text)
+
+        if text is not self.text and text != self.text:
+            # Collect the references once per text, later passes over the same
+            # text only fill in the blocks that are still missing
+            self.cache.update(self.pass_cache)  # Keep blocks of an unfinished render
+            self.text = text
+            self.split = split_blocks(text)
+            self.references = {}
+            for line, block in self.split:
+                if '[' in block and REFERENCE_RE.search(block):
+                    self.references.update(self.convert(block, None)[1])
+            self.signature = tuple(sorted(self.references.items()))
+            self.results = [None] * len(self.split)
+            self.pass_cache = {}
+            self.passes = 0
+        blocks = self.split
+        references = self.references
+        signature = self.signature
+        results = self.results
+        cache = self.pass_cache
+
+        if viewport is None:
+            order = range(len(blocks))
+            deadline = None
+        else:
+            # Each further pass over the same text may take longer, the
+            # visible part is already on screen by then
+            order = _viewport_order(blocks, *viewport)
+            deadline = time.monotonic() + min(budget * 2 ** min(self.passes, 16), self.MAX_BUDGET)
+            self.passes += 1
+
+        for index in order:
+            if results[index] is not None:
+                continue
+            line, block = blocks[index]
+            key = (block, signature if references and '[' in block else None)
+            result = cache.get(key) or self.cache.get(key)
+            if result is None:
+                if deadline is not None and time.monotonic() > deadline and not _visible(blocks, index, viewport):
+                    continue
+                result = self.convert(block, references if key[1] else None)
+            cache[key] = result
+            results[index] = result
+
+        self.complete = None not in results
+        if self.complete:
+            self.cache = cache
+
+        rendered = []
+        for (line, block), result in zip(blocks, results):
+            if result is None:
+                rendered.append((line, PLACEHOLDER % (1.5 * (block.count('\n') + 1))))
+            elif result[0]:
+                rendered.append((line, result[0]))
+
+        if self.complete:
+            ids = HEADER_ID_RE.findall(''.join(html for line, html in rendered))
+            if len(ids) != len(set(ids)):
+                # toc de-duplicates ids across the whole document
+                return self._render_full(text)
+
+        self.blocks = rendered
+        return '\n'.join(html for line, html in rendered)
+
+    def _render_full(self, text):
+        html = self.convert(text)[0]
+        self.cache = {}
+        self.text = None
+        self.complete = True
+        self.blocks = [(0, html)]
+        return html
+
+
+def _visible(blocks, index, viewport):
+    first, last = viewport
+    start = blocks[index][0]
+    end = blocks[index + 1][0] if index + 1 < len(blocks) else start + blocks[index][1].count('\n')
+    return start <= last and end >= first
+
+
+def _viewport_order(blocks, first, last):
+    """ Block indexes starting at the viewport and working outwards """
+    middle = bisect.bisect_right([line for line, block in blocks], first) - 1
+    middle = max(middle, 0)
+    below = range(middle, len(blocks))
+    above = range(middle - 1, -1, -1)
+    order = []
+    for pair in itertools.zip_longest(below, above):
+        order.extend(index for index in pair if index is not None)
+    return order
+
+
+# Checks that rendering block by block matches a full render:
+# python remarkable/incremental.py
+if __name__ == "__main__":
+    import markdown
+
+    md = markdown.Markdown(extensions=['markdown.extensions.extra'])
+
+    def convert(text, references=None):
+        md.reset()
+        if references:
+            md.references.update(references)
+        return md.convert(text), dict(md.references)
+
+    SAMPLES = [
+        "Apple\n:   Pomaceous fruit\n\nOrange\n:   Citrus fruit",
+        "Apple\n:   Pomaceous fruit\n\n    More about apples\n\nOrange\nTangerine\n:   Citrus fruit",
+        "# H\n: def\n\nOrange\nTangerine\n\n: Citrus fruit",
+        " \n    code\n\ntext",
+        "\t\nfoo\n\n    bar",
+        "\t\n\t\nTerm",
+        "  \n- a\n\n- b",
+        "- a\n\n- b\n\n> quote\n\n> more\n\n[link]\n\n[link]: http://example.com",
+        "```\nfenced\n\ncode\n```\n\nText\n\n    indented",
+    ]
+    for text in SAMPLES:
+        expected = convert(text)[0]
+        html = IncrementalRenderer(convert).render(text)
+        assert html == expected, (text, html, expected)
+    print("%d samples match" % len(SAMPLES))
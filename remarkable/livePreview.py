@@ -0,0 +1,209 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import bisect
+import json
+import logging
+
+from gi.repository import GLib, WebKit2
+
+logger = logging.getLogger('remarkable')
+
+BLOCK_MARKER = '<!--remarkable-block-->'
+END_MARKER = '<!--remarkable-end-->'
+
+# Scripts and the highlight.js theme are injected by PreviewContent, the page
+# itself only carries the document style sheet and the body
+PAGE_START = '<!doctype HTML><html><head><meta charset="utf-8"><style id="remarkable-style">'
+PAGE_BODY = '</style></head><body>'
+PAGE_END = '</body></html>'
+
+
+class LivePreview(object):
+    """
+        Keeps the WebKit live preview page loaded and patches its body.
+
+        The page is loaded once with every rendered block preceded by a marker
+        comment. Later updates compare the new blocks with the ones on screen
+        and send only the changed run to preview.js, which swaps those nodes
+        in place. The style sheet lives in a single element of the page and is
+        swapped the same way, so changing the style never renders again. Any
+        failure falls back to a full load_html.
+
+        The page reports the pixel offset of every block, which together with
+        the first source line of each block maps source lines to preview
+        offsets and back. on_layout() is called when the offsets change and
+        on_scroll(line) when the user scrolls the preview.
+    """
+
+    def __init__(self, web_view, on_scroll=None, on_layout=None):
+        self.web_view = web_view
+        self.web_view.connect("load-changed", self.on_load_changed)
+        manager = web_view.get_user_content_manager()
+        manager.register_script_message_handler("remarkable")
+        manager.connect("script-message-received::remarkable", self.on_message)
+        self.on_scroll = on_scroll
+        self.on_layout = on_layout
+        self.page = None  # Base URI of the loaded page
+        self.blocks = []  # Blocks currently shown, or being loaded
+        self.lines = []  # First source line of each block
+        self.line_count = 1
+        self.offsets = []  # Pixel offset of each block, as measured by the page
+        self.height = 0
+        self.css = ''
+        self.page_css = None  # Style sheet currently applied to the page
+        self.loading = False
+        self.pending = None  # Blocks that arrived while the page was loading
+
+    def show(self, blocks, base_uri, line_count):
+        """ Show (first source line, HTML) blocks of a line_count long text """
+        self.lines = [line for line, html in blocks]
+        self.line_count = line_count
+        blocks = [html for line, html in blocks]
+        if base_uri != self.page:
+            self.load(blocks, base_uri)
+        elif self.loading:
+            self.pending = blocks
+        else:
+            self.patch(blocks)
+
+    def set_style(self, css):
+        self.css = css
+        if self.page is not None and not self.loading:
+            self.apply_style()
+
+    def apply_style(self):
+        if self.page_css != self.css:
+            self.page_css = self.css
+            script = "remarkable.setStyle(%s)" % json.dumps(self.css)
+            self.web_view.run_javascript(script, None, self.on_patched, None)
+
+    def reload(self):
+        if self.page is not None:
+            self.load(self.pending or self.blocks, self.page)
+
+    def load(self, blocks, page):
+        body = ''.join(BLOCK_MARKER + block + '\n' for block in blocks)
+        self.page = page
+        self.blocks = list(blocks)
+        self.page_css = self.css
+        self.pending = None
+        self.loading = True
+        css = self.css.replace('</', '<\\/')  # Must not close the style element
+        self.web_view.load_html(PAGE_START + css + PAGE_BODY + body + END_MARKER + PAGE_END, page)
+
+    def patch(self, blocks):
+        old = self.blocks
+        start = 0
+        while start < len(old) and start < len(blocks) and old[start] == blocks[start]:
+            start += 1
+        end_old = len(old)
+        end_new = len(blocks)
+        while end_old > start and end_new > start and old[end_old - 1] == blocks[end_new - 1]:
+            end_old -= 1
+            end_new -= 1
+        if start == end_old and start == end_new:
+            return  # Nothing changed
+
+        self.blocks = list(blocks)
+        script = "remarkable.patch(%d, %d, %s)" % (start, end_old - start,
+                                                   json.dumps(blocks[start:end_new]))
+        self.web_view.run_javascript(script, None, self.on_patched, None)
+
+    def on_patched(self, web_view, result, user_data):
+        try:
+            patched = web_view.run_javascript_finish(result).get_js_value().to_boolean()
+        except GLib.Error as e:
+            logger.debug("Preview patch failed: %s", e)
+            patched = False
+        if not patched:
+            self.reload()
+
+    def line_to_offset(self, line):
+        """ The preview offset of a (fractional) source line, None before the first layout """
+        if not self.offsets:
+            return None
+        return _interpolate(self.lines, self.offsets, line, self.line_count, self.height)
+
+    def offset_to_line(self, offset):
+        """ The (fractional) source line shown at a preview offset, None before the first layout """
+        if not self.offsets:
+            return None
+        return _interpolate(self.offsets, self.lines, offset, self.height, self.line_count)
+
+    def scroll_to(self, offset):
+        self.web_view.run_javascript("remarkable.scrollTo(%d)" % offset, None, None, None)
+
+    def on_message(self, manager, result):
+        try:
+            message = json.loads(result.get_js_value().to_string())
+        except (GLib.Error, ValueError) as e:
+            logger.debug("Bad message from the preview: %s", e)
+            return
+        if 'offsets' in message:
+            offsets = message['offsets']
+            if len(offsets) != len(self.lines):
+                return  # Measured before the latest patch, another measurement follows
+            for i in range(1, len(offsets)):
+                offsets[i] = max(offsets[i], offsets[i - 1])
+            self.offsets = offsets
+            self.height = max(message['height'], offsets[-1] if offsets else 0)
+            if self.on_layout is not None:
+                self.on_layout()
+        elif 'scroll' in message and self.on_scroll is not None:
+            line = self.offset_to_line(message['scroll'])
+            if line is not None:
+                self.on_scroll(line)
+
+    def on_load_changed(self, web_view, event):
+        if event == WebKit2.LoadEvent.FINISHED:
+            self.loading = False
+            self.apply_style()  # The style may have changed while loading
+            if self.pending is not None:
+                blocks = self.pending
+                self.pending = None
+                self.patch(blocks)
+
+
+def _interpolate(xs, ys, x, x_end, y_end):
+    """
+        Map x onto y, linearly between the points of the sorted xs and the
+        matching ys, with (0, 0) before the first point and (x_end, y_end)
+        after the last one.
+
+        >>> _interpolate([0, 10, 20], [0, 100, 400], 15, 30, 500)
+        250.0
+        >>> _interpolate([0, 10, 20], [0, 100, 400], 25, 30, 500)
+        450.0
+        >>> _interpolate([2, 10], [50, 100], 1, 20, 200)
+        25.0
+    """
+    i = bisect.bisect_right(xs, x) - 1
+    if i < 0:
+        x0, y0, x1, y1 = 0, 0, xs[0], ys[0]
+    elif i + 1 < len(xs):
+        x0, y0, x1, y1 = xs[i], ys[i], xs[i + 1], ys[i + 1]
+    else:
+        x0, y0, x1, y1 = xs[i], ys[i], x_end, y_end
+    if x1 <= x0:
+        return float(y0)
+    return y0 + (min(x, x1) - x0) * (y1 - y0) / (x1 - x0)
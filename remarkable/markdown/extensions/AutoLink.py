@@ -4,46 +4,161 @@ from markdown.extensions import Extension
 import xml.etree.ElementTree as etree
 import re
 
-# Define the URL pattern (e.g. google.com, http://example.com, etc.)
-URL_REGEX = r'(https?://[^\s]+|www\.[^\s]+|[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'
+# Find candidate tokens (e.g. google.com, http://example.com, etc.): a run of
+# non-space characters at the start of a word, after any opening punctuation,
+# that contains "://" or a dot followed by a letter or digit. None of the parts
+# overlap, so each word is matched at most once and matching takes linear time.
+# The \x02 and \x03 that delimit stashed placeholders end a token.
+OPENING = r'(\[{"\'*_~>'
+URL_REGEX = (r'(?<!\S)([%s]*)' % re.escape(OPENING) +
+             r'([^\s\x02\x03.:<%s]*(?:\.[a-zA-Z0-9]|://)[^\s\x02\x03<]*)' % re.escape(OPENING))
+
+SCHEMES = ('http://', 'https://')
+HOST_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.-')
+# Characters that end a sentence or close a bracket rather than belong to the URL
+TRAILING = '.,:;!?\'"*_~)]}>'
+# A bare domain followed by one of these continues with a port, path, query or fragment
+PATH_START = '/:?#'
+
+
+def find_url(token):
+    """
+        The URL at the start of token, or None.
+
+        >>> find_url('google.com.')
+        'google.com'
+        >>> find_url('https://en.wikipedia.org/wiki/Python_(language)),')
+        'https://en.wikipedia.org/wiki/Python_(language)'
+        >>> find_url('example.com/path?q=1')
+        'example.com/path?q=1'
+        >>> find_url('foo.example.com:8080/path'), find_url('example.com: see')
+        ('foo.example.com:8080/path', 'example.com')
+        >>> find_url('1.2.3.4') is None, find_url('file_name.txt') is None
+        (True, True)
+    """
+    if token.startswith(SCHEMES) or token.startswith('www.'):
+        start = token.index('://') + 3 if '://' in token else 4
+        url = _strip_trailing(token)
+        return url if len(url) > start else None
+
+    # A bare domain: host characters ending in a dot and at least two letters
+    end = 0
+    while end < len(token) and token[end] in HOST_CHARS:
+        end += 1
+    host = token[:end]
+    dot = host.rfind('.')
+    while dot > 0:
+        letters = dot + 1
+        while letters < end and host[letters].isalpha() and host[letters].isascii():
+            letters += 1
+        if letters - dot > 2:
+            end = letters
+            break
+        dot = host.rfind('.', 0, dot)
+    else:
+        return None
+
+    if end == len(token):
+        return token
+    # A colon followed by digits is a port, otherwise it ends the sentence
+    if token[end] in PATH_START and (token[end] != ':' or token[end + 1:end + 2].isdigit()):
+        return _strip_trailing(token)
+    if token[end] in TRAILING:
+        return token[:end]
+    return None  # Part of a longer word, e.g. an email address
+
+
+def _strip_trailing(url):
+    while url and url[-1] in TRAILING:
+        # Keep a closing parenthesis that belongs to the URL
+        if url[-1] == ')' and url.count('(') >= url.count(')'):
+            break
+        url = url[:-1]
+    return url
+
+
+class _Prechecked(object):
+    """ The compiled pattern, skipping text that cannot contain a URL """
+
+    def __init__(self, compiled_re):
+        self.compiled_re = compiled_re
+
+    def finditer(self, data, pos=0):
+        if '.' not in data and '://' not in data:
+            return iter(())
+        return self.compiled_re.finditer(data, pos)
+
 
 class AutoLinkPattern(InlineProcessor):
+    # Never link text inside a link
+    ANCESTOR_EXCLUDES = ('a',)
+
     def __init__(self, pattern):
         super().__init__(pattern)
+        self.prechecked = _Prechecked(self.compiled_re)
+
+    def getCompiledRegExp(self):
+        return self.prechecked
 
     def handleMatch(self, m, data):
-        if m:  # Ensure match exists
-            url = m.group(0)  # The entire matched URL
+        url = find_url(m.group(2))
+        if url is None:
+            # Always return a tuple (None, None, None) in case of no match
+            return None, None, None
 
-            # If the URL doesn't have a scheme (e.g. http or https), add 'http://'
-            if not url.startswith(('http://', 'https://')):
-                url = 'http://' + url
+        text = url
+        # If the URL doesn't have a scheme (e.g. http or https), add 'http://'
+        if not url.startswith(SCHEMES):
+            url = 'http://' + url
 
-            # Create an <a> element
-            el = etree.Element('a')
-            el.set('href', url)
-            el.text = markdown.util.AtomicString(m.group(0))  # The original URL text
+        # Create an <a> element
+        el = etree.Element('a')
+        el.set('href', url)
+        el.text = markdown.util.AtomicString(text)  # The original URL text
 
-            # Return the element and the start/end position of the match
-            return el, m.start(0), m.end(0)
-        
-        # Always return a tuple (None, None, None) in case of no match
-        return None, None, None
+        # Return the element and the start/end position of the URL
+        return el, m.start(2), m.start(2) + len(text)
 
 class AutoLink(Extension):
     def extendMarkdown(self, md):
         # Add the AutoLinkPattern to the markdown inline patterns
         autolink_pattern = AutoLinkPattern(URL_REGEX)
-        # Register it with priority 150 so it runs before other patterns like emphasis
-        md.inlinePatterns.register(autolink_pattern, 'autolink', 150)
+        # Register it with priority 150 so it runs before other patterns like emphasis,
+        # under its own name so <http://...> is still handled by Markdown's 'autolink'
+        md.inlinePatterns.register(autolink_pattern, 'bare_autolink', 150)
 
 # Factory function to create the extension
 def makeExtension(**kwargs):
     return AutoLink(**kwargs)
 
-# Example usage:
+# Example usage, and a check that pathological input renders in linear time:
+# python -m remarkable.markdown.extensions.AutoLink
 if __name__ == "__main__":
+    import doctest
+    import time
+
+    doctest.testmod()
+
     text = "Here is a link: google.com and another one http://example.com"
-    md = markdown.Markdown(extensions=[AutoLinkExtension()])
+    md = markdown.Markdown(extensions=[AutoLink()])
     html = md.convert(text)
     print(html)
+
+    SIZE = 200000
+    PATHOLOGICAL = {
+        'dotted token': 'a.' * (SIZE // 2),
+        'version string': '1.2.' * (SIZE // 4),
+        'hostname without tld': 'host-' * (SIZE // 5) + '.x',
+        'long url': 'http://example.com/' + 'a' * SIZE,
+        'dots': '.' * SIZE,
+        'underscores': '_' * SIZE + 'x.com',
+        'brackets': '(' * SIZE + 'x.com',
+        'log excerpt': '2024-01-01 12:00:00.123 INFO org.example.service.Handler - ' * (SIZE // 60),
+        'many domains': 'example.com ' * (SIZE // 12),
+    }
+    for name, text in sorted(PATHOLOGICAL.items()):
+        start = time.perf_counter()
+        md.reset().convert(text)
+        seconds = time.perf_counter() - start
+        print("%-22s %6.3f s" % (name, seconds))
+        assert seconds < 2.0, name
@@ -3,7 +3,7 @@
 import re
 
 from markdown.extensions import Extension
-from markdown.postprocessors import Postprocessor
+from markdown.treeprocessors import Treeprocessor
 
 class Checklist(Extension):
 
@@ -18,30 +18,74 @@ class Checklist(Extension):
     def extendMarkdown(self, md):
         list_class = self.getConfig('list_class')
         renderer = self.getConfig('render_item')
-        postprocessor = ChecklistPostprocessor(list_class, renderer, md)
-        md.postprocessors.register(postprocessor, 'checklist', 50)
+        treeprocessor = ChecklistTreeprocessor(list_class, renderer, md)
+        # After 'unescape', so an escaped \[x\] is a checkbox too
+        md.treeprocessors.register(treeprocessor, 'checklist', -10)
 
 
-class ChecklistPostprocessor(Postprocessor):
-    list_pattern = re.compile(r'(<ul>\n<li>\[[ Xx]\])')
-    item_pattern = re.compile(r'^<li>\[([ Xx])\](.*)</li>$', re.MULTILINE)
+class ChecklistTreeprocessor(Treeprocessor):
+    """
+        Turns list items starting with [ ] or [x] into checkboxes.
+
+        Only list items are visited, and only those whose text starts with
+        a checkbox are serialized. The HTML is the same as matching the
+        serialized document line by line: an item is converted when it
+        fits on one line, and a <ul> whose first item has a checkbox gets
+        list_class. render_item() returns the HTML of the whole item, which
+        takes the item's place through the HTML stash.
+    """
+    item_pattern = re.compile(r'<li>\[([ Xx])\](.*)</li>')
 
     def __init__(self, list_class, render_item, *args, **kwargs):
         self.list_class = list_class
         self.render_item = render_item
-        super(ChecklistPostprocessor, self).__init__(*args, **kwargs)
+        super(ChecklistTreeprocessor, self).__init__(*args, **kwargs)
+
+    def run(self, root):
+        items = []
+        for tag in ('ul', 'ol'):
+            for parent in root.iter(tag):
+                for index, item in enumerate(parent):
+                    if item.tag == 'li' and _is_checkbox(item):
+                        items.append((parent, index, item))
+                        if tag == 'ul' and index == 0 and parent.text == '\n' and not parent.attrib:
+                            parent.set('class', self.list_class)
+
+        # Replace from the end so the indexes of earlier siblings stay valid
+        for parent, index, item in reversed(items):
+            # The item has to start a line as well
+            previous = parent[index - 1] if index else None
+            before = parent.text if previous is None else previous.tail
+            match = self._match(item) if (before or '').endswith('\n') else None
+            if match is None:
+                continue
+            state, caption = match.groups()
+            placeholder = self.md.htmlStash.store(self.render_item(caption, state != ' '))
+            if previous is None:
+                parent.text += placeholder + item.tail
+            else:
+                previous.tail += placeholder + item.tail
+            parent.remove(item)
 
-    def run(self, html):
-        html = re.sub(self.list_pattern, self._convert_list, html)
-        return re.sub(self.item_pattern, self._convert_item, html)
+    def _match(self, item):
+        """ Match the item as serialized on a line of its own, or None """
+        if not (item.tail or '').startswith('\n'):
+            return None
+        tail = item.tail
+        item.tail = None
+        try:
+            html = self.md.serializer(item)
+        finally:
+            item.tail = tail
+        if '\n' in html:
+            return None
+        return self.item_pattern.fullmatch(html)
 
-    def _convert_list(self, match):
-        return match.group(1).replace('<ul>',
-                '<ul class="%s">' % self.list_class)
 
-    def _convert_item(self, match):
-        state, caption = match.groups()
-        return self.render_item(caption, state != ' ')
+def _is_checkbox(item):
+    text = item.text
+    return (text is not None and len(text) >= 3 and text[0] == '[' and text[2] == ']'
+            and text[1] in ' Xx' and not item.attrib)
 
 
 def render_item(caption, checked):
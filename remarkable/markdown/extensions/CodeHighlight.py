@@ -0,0 +1,178 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from html import escape, unescape
+
+from markdown.extensions import Extension
+from markdown.postprocessors import Postprocessor
+
+try:
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+except ImportError:
+    get_lexer_by_name = None  # Optional, without Pygments highlight.js does all the work
+
+# A fenced code block as the fenced_code extension stashes it
+FENCED_RE = re.compile(r'<pre([^>]*)><code class="language-([\w+#.-]+)">(.*)</code></pre>', re.DOTALL)
+
+# highlight.js class for Pygments token types, a token without an entry uses its parent's
+CLASSES = {
+    'Keyword': 'keyword',
+    'Keyword.Constant': 'literal',
+    'Keyword.Type': 'type',
+    'Name.Builtin': 'built_in',
+    'Name.Class': 'title',
+    'Name.Function': 'title',
+    'Name.Exception': 'title',
+    'Name.Decorator': 'meta',
+    'Name.Tag': 'name',
+    'Name.Attribute': 'attr',
+    'Name.Variable': 'variable',
+    'Name.Label': 'symbol',
+    'Name.Entity': 'symbol',
+    'Literal.String': 'string',
+    'Literal.String.Regex': 'regexp',
+    'Literal.String.Interpol': 'subst',
+    'Literal.String.Symbol': 'symbol',
+    'Literal.Number': 'number',
+    'Literal.Date': 'number',
+    'Operator.Word': 'keyword',
+    'Comment': 'comment',
+    'Comment.Preproc': 'meta',
+    'Comment.PreprocFile': 'string',
+    'Comment.Hashbang': 'meta',
+    'Comment.Special': 'doctag',
+    'Generic.Deleted': 'deletion',
+    'Generic.Inserted': 'addition',
+    'Generic.Heading': 'section',
+    'Generic.Subheading': 'section',
+    'Generic.Emph': 'emphasis',
+    'Generic.Strong': 'strong',
+    'Generic.Prompt': 'meta',
+}
+
+
+def _class(token):
+    name = '.'.join(token)
+    while name not in CLASSES and name:
+        name = name.rpartition('.')[0]
+    return CLASSES.get(name)
+
+
+class HighlightCache(object):
+    """
+        Highlighted HTML of code blocks by language and a hash of the code,
+        least recently used entries are dropped beyond MAX_ENTRIES. The
+        HTML only carries highlight.js classes, the theme is up to the
+        style sheet.
+    """
+
+    MAX_ENTRIES = 1024
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()  # Used from the render thread and the main loop
+
+    def highlight(self, language, code):
+        """ The code as HTML with <span class="hljs-..."> elements, or None for an unknown language """
+        key = (language, hashlib.sha1(code.encode('utf-8')).digest())
+        with self.lock:
+            html = self.entries.get(key)
+            if html is not None:
+                self.entries.move_to_end(key)
+                return html or None
+
+        try:
+            lexer = get_lexer_by_name(language, stripnl=False, ensurenl=False)
+            html = ''.join(self._spans(lexer.get_tokens(code)))
+        except ClassNotFound:
+            html = ''
+
+        with self.lock:
+            self.entries[key] = html
+            while len(self.entries) > self.MAX_ENTRIES:
+                self.entries.popitem(last=False)
+        return html or None
+
+    @staticmethod
+    def _spans(tokens):
+        # Neighbouring tokens with the same class share one span
+        current, text = None, []
+        for token, value in tokens:
+            name = _class(token)
+            if name != current:
+                if text:
+                    yield _span(current, ''.join(text))
+                current, text = name, []
+            text.append(value)
+        if text:
+            yield _span(current, ''.join(text))
+
+
+def _span(name, text):
+    text = escape(text, quote=False)
+    return text if name is None else '<span class="hljs-%s">%s</span>' % (name, text)
+
+
+class CodeHighlightPostprocessor(Postprocessor):
+    """
+        Highlights fenced code blocks with a language in the HTML stash,
+        before the stash is put back into the document. The blocks get the
+        classes highlight.js would give them, including "hljs", which tells
+        the page to leave them alone. Code in a language Pygments does not
+        know, or without a language, is still highlighted in the page.
+    """
+
+    def __init__(self, md, cache):
+        super(CodeHighlightPostprocessor, self).__init__(md)
+        self.cache = cache
+
+    def run(self, text):
+        blocks = self.md.htmlStash.rawHtmlBlocks
+        for index, block in enumerate(blocks):
+            if not isinstance(block, str) or not block.startswith('<pre'):
+                continue
+            match = FENCED_RE.fullmatch(block)
+            if match is None:
+                continue
+            attributes, language, code = match.groups()
+            html = self.cache.highlight(language.lower(), unescape(code))
+            if html is not None:
+                blocks[index] = '<pre%s><code class="language-%s hljs">%s</code></pre>' % (
+                    attributes, language, html)
+        return text
+
+
+_cache = HighlightCache()
+
+class CodeHighlight(Extension):
+    def extendMarkdown(self, md):
+        if get_lexer_by_name is None:
+            return
+        # Before 'raw_html' (30) puts the stash back
+        md.postprocessors.register(CodeHighlightPostprocessor(md, _cache), 'code_highlight', 35)
+
+def makeExtension(**kwargs):
+    return CodeHighlight(**kwargs)
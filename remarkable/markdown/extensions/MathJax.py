@@ -1,27 +1,562 @@
 import markdown
-from markdown.inlinepatterns import InlineProcessor
+from markdown.preprocessors import Preprocessor
 from markdown.extensions import Extension
 import xml.etree.ElementTree as etree
+from collections import OrderedDict
+import bisect
+import hashlib
+import os
+import re
+import tempfile
+import threading
 
-class MathJaxPattern(InlineProcessor):
-    def __init__(self, pattern):
-        super().__init__(pattern)
+try:
+    from latex2mathml.converter import convert as latex_to_mathml
+    from importlib.metadata import version
+    CONVERTER_VERSION = version('latex2mathml')
+except ImportError:
+    latex_to_mathml = None  # Optional, without it the MathML extension emits <mathjax> elements
 
-    def handleMatch(self, m, data):
-        node = etree.Element("mathjax")
+# Blank lines end a paragraph, math never spans them. Markdown drops the
+# newlines at the very start of the text.
+BLANK_RE = re.compile(r'\A\n+|\n(?:[ \t]*\n)+')
+LIST_RE = re.compile(r'[ ]{0,3}(?:[*+-]|\d+\.)[ \t]')
+# A list marker with the spaces the item text starts after
+MARKER_RE = re.compile(r'[ ]{0,3}(?:[*+-]|\d+\.)[ \t]+')
+# Within a list any such line starts an item, nested ones are indented further
+ITEM_RE = re.compile(r'[ ]*(?:[*+-]|\d+\.)[ \t]')
+QUOTE_RE = re.compile(r'[ ]{0,3}>[ ]?')
+# Lines that start a new block even in the middle of a paragraph: headings,
+# rules, and link, footnote or abbreviation definitions
+BREAK_RE = re.compile(r'#(?:\\.|[^\\])*$|[ ]{0,3}(?:\*?\[[^\]]*\]:|'
+                      r'(?:(?:-+[ ]{0,2}){3,}|(?:_+[ ]{0,2}){3,}|(?:\*+[ ]{0,2}){3,})[ ]*$)')
+# A heading, Markdown does not take one that ends in a lone backslash
+HEADING_RE = re.compile(r'^#(?:\\.|[^\\\n])*\n', re.MULTILINE)
+# A definition, which ends the paragraph of terms before it
+DEFINITION_RE = re.compile(r'[ ]{0,3}:[ ]')
+# Underlines the first line of a block into a heading
+SETEXT_RE = re.compile(r'[=-]+[ ]*$')
+# Where a code span or math may start
+OPENER_RE = re.compile(r'`+|\$')
 
-        delimiter = m.group(1)
-        content = m.group(2)
 
-        node.text = markdown.util.AtomicString(delimiter + content + delimiter)
+class _Terms(object):
+    """
+        Where a definition list starts further down a block, which makes each
+        line above it a term of its own. Worked out once per block, on the
+        first question. defined is whether the next block is a definition,
+        which takes the last lines of this one as its terms.
+    """
+
+    def __init__(self, block, defined=False):
+        self.block = block
+        self.defined = defined
+        self.lines = self.starts = None
+        self.terms = {}  # Quote depth -> whether each line is a term
+
+    def below(self, pos, depth=0):
+        """ Whether the line starting at pos and those after it are terms, in quotes of depth """
+        if pos > len(self.block):
+            return self.defined and not depth
+        if self.lines is None:
+            self.lines = self.block.split('\n')
+            self.starts = [0]
+            for line in self.lines[:-1]:
+                self.starts.append(self.starts[-1] + len(line) + 1)
+        if depth not in self.terms:
+            self.terms[depth] = self._scan(depth)
+        return self.terms[depth][bisect.bisect_left(self.starts, pos)]
+
+    def _scan(self, depth):
+        # The nearest definition or paragraph break at or below each line decides
+        terms = [False] * len(self.lines)
+        term = self.defined and not depth
+        for index in range(len(self.lines) - 1, -1, -1):
+            line = self.lines[index]
+            line_depth = _quote_depth(line)
+            content = _strip_quotes(line, line_depth)
+            if line_depth > depth:
+                term = False  # A deeper quote starts a block of its own
+            elif DEFINITION_RE.match(content):
+                term = True
+            elif BREAK_RE.match(content):
+                term = False
+            terms[index] = term
+        return terms
+
+
+class _Finder(object):
+    """
+        Repeated searches for one pattern from increasing positions. A search
+        that cannot go past the previous result reuses it, so all the
+        searches over a text take linear time together.
+    """
+
+    def __init__(self, text, pattern):
+        self.text = text
+        self.pattern = pattern
+        self.found = None
+
+    def find(self, pos):
+        if self.found is None or (self.found != -1 and self.found < pos):
+            m = self.pattern.search(self.text, pos)
+            self.found = m.start() if m else -1
+        return self.found
+
+
+class MathJaxPreprocessor(Preprocessor):
+    """
+        Replaces $...$ and $$...$$ with placeholders for <mathjax> elements
+        before any other Markdown processing, so math is left alone by
+        emphasis, smarty and the rest.
+
+        Math is found the way the inline pattern (?<!\\)(\$\$?)(.+?)\1 did,
+        within a paragraph, list item or table cell, but in a single pass:
+        code spans and indented code blocks are skipped, and an opening $
+        after a backslash is text. Math that spans lines in a blockquote
+        loses the quote markers of its continuation lines. Where putting
+        such math on one line would make a heading or a table of its
+        paragraph, it is left as text.
+        Fenced code and raw HTML are stashed before this runs.
+    """
+
+    def run(self, lines):
+        text = '\n'.join(lines)
+        if '$' not in text:
+            return lines
+
+        out = []
+        pos = 0
+        in_list = False
+        for separator in BLANK_RE.finditer(text):
+            defined = DEFINITION_RE.match(text, separator.end()) is not None
+            block, in_list = self._block(text[pos:separator.start()], in_list, defined)
+            out.append(block)
+            out.append(separator.group(0))
+            pos = separator.end()
+        out.append(self._block(text[pos:], in_list)[0])
+        return ''.join(out).split('\n')
+
+    def _block(self, block, in_list, defined=False):
+        """
+            The block with its math stashed, and whether a list goes on after
+            it. defined is whether a definition follows the block.
+        """
+        heading = HEADING_RE.search(block)
+        if heading is not None and heading.end() < len(block) and not self._table(block):
+            # The lines after a heading make a block of their own
+            before, in_list = self._block(block[:heading.end()], in_list)
+            after, in_list = self._block(block[heading.end():], in_list, defined)
+            return before + after, in_list
+        stripped = block.lstrip(' ')
+        indent = len(block) - len(stripped)
+        if indent < 4:
+            in_list = LIST_RE.match(block) is not None
+        if indent >= (8 if in_list else 4):
+            # Indented code, the lines after it make a block of their own
+            code_end = _code_end(block, 8 if in_list else 4)
+        else:
+            depth = _quoted_code(block)
+            code_end = _code_end(block, 4, depth) if depth else 0
+        code, block = block[:code_end], block[code_end:]
+        if '$' not in block:
+            return code + block, in_list
+        return code + self._stash_block(block, in_list, defined), in_list
+
+    def _stash_block(self, block, in_list, defined=False):
+        table = self._table(block)
+        in_list = in_list or LIST_RE.match(_strip_quotes(block, _quote_depth(block))) is not None
+        # Only a paragraph gives its lines to the definition after it
+        defined = defined and not in_list and not QUOTE_RE.match(block)
+        spans = _spans(block, table, in_list, defined)
+        if spans and not table and '|' in block:
+            # Math hiding pipes can leave rows that do make a table
+            placeholder = markdown.util.HTML_PLACEHOLDER % 0
+            if self._table(_replace(block, spans, lambda *span: placeholder)):
+                spans = _spans(block, True, in_list, defined)
+        return _replace(block, spans, lambda *span: self._placeholder(block, *span))
+
+    def _table(self, block):
+        """ Whether the tables extension makes a table of block, inside its list item and quotes """
+        tables = self.md.parser.blockprocessors
+        if 'table' not in tables or '|' not in block:
+            return False
+        depth, first = _content(block)
+        lines = [first] + [_strip_quotes(line, depth) for line in block.split('\n')[1:]]
+        return tables['table'].test(None, '\n'.join(lines))
+
+    def _placeholder(self, block, start, delimiter, end):
+        math = block[start:end + len(delimiter)]
+        if '\n' in math:
+            # Inside a blockquote the continuation lines carry its markers
+            line_start = block.rfind('\n', 0, start) + 1
+            depth = _quote_depth(block[line_start:start])
+            if depth:
+                math = '\n'.join([math.split('\n')[0]] +
+                                 [_strip_quotes(line, depth) for line in math.split('\n')[1:]])
+        return self.md.htmlStash.store(self.render(math, delimiter))
+
+    def render(self, math, delimiter):
+        """ The HTML for math, including its delimiters """
+        node = etree.Element('mathjax')
+        node.text = markdown.util.AtomicString(math)
+        return self.md.serializer(node)
+
+
+class MathMLPreprocessor(MathJaxPreprocessor):
+    """
+        Converts math to MathML while rendering, so the page needs no
+        typesetting pass. Math the converter cannot handle is left to
+        MathJax as a <mathjax> element.
+    """
+
+    def __init__(self, md, cache):
+        super(MathMLPreprocessor, self).__init__(md)
+        self.cache = cache
+
+    def render(self, math, delimiter):
+        mathml = self.cache.convert(math[len(delimiter):-len(delimiter)], delimiter == '$$')
+        if mathml is None:
+            return super(MathMLPreprocessor, self).render(math, delimiter)
+        return mathml
+
+
+class MathMLCache(object):
+    """
+        TeX to MathML conversions, kept in memory and in one file per
+        formula under directory. Files are named by a hash of the display
+        mode, the TeX source and the converter version, and are shared by
+        every Remarkable process. An empty file records a formula the
+        converter failed on.
+    """
+
+    MAX_ENTRIES = 4096
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()  # Used from the render thread and the main loop
+
+    def convert(self, tex, display):
+        """ The MathML for tex, or None if it cannot be converted """
+        key = hashlib.sha1(('%s\n%s\n%s' % (CONVERTER_VERSION, 'block' if display else 'inline',
+                                             tex)).encode('utf-8')).hexdigest()
+        with self.lock:
+            mathml = self.entries.get(key)
+            if mathml is not None:
+                self.entries.move_to_end(key)
+                return mathml or None
+
+        mathml = self._read(key)
+        if mathml is None:
+            try:
+                mathml = latex_to_mathml(tex, display='block' if display else 'inline')
+            except Exception:
+                mathml = ''
+            self._write(key, mathml)
+
+        with self.lock:
+            self.entries[key] = mathml
+            while len(self.entries) > self.MAX_ENTRIES:
+                self.entries.popitem(last=False)
+        return mathml or None
+
+    def _read(self, key):
+        try:
+            with open(os.path.join(self.directory, key + '.xml'), encoding='utf-8') as cached:
+                return cached.read()
+        except OSError:
+            return None
+
+    def _write(self, key, mathml):
+        # Written under a temporary name first, other processes only ever see whole files
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as cached:
+                cached.write(mathml)
+            os.replace(path, os.path.join(self.directory, key + '.xml'))
+        except OSError:
+            pass  # The cache is only an optimization
+
+
+def _spans(block, table, in_list, defined=False):
+    """ The (start, delimiter, end) of each piece of math in block """
+    spans = []
+    start = 0
+    dollars = _Finder(block, re.compile(r'\$\$'))
+    dollar = _Finder(block, re.compile(r'\$'))
+    terms = _Terms(block, defined)
+    runs = None
+    while True:
+        m = OPENER_RE.search(block, start)
+        if m is None:
+            break
+        start = m.start()
+        if m.group(0) != '$':
+            if runs is None:
+                runs = _backtick_runs(block)
+            start = _code_span_end(block, start, m.end(), runs)
+            continue
+        if start and block[start - 1] == '\\':
+            start += 1
+            continue
+
+        candidates = [('$', dollar.find(start + 2))]
+        if block.startswith('$$', start):
+            candidates.insert(0, ('$$', dollars.find(start + 3)))
+        for delimiter, end in candidates:
+            if end != -1 and _one_paragraph(block, start, end, table, in_list, terms):
+                break
+        else:
+            start += 1
+            continue
+
+        spans.append((start, delimiter, end))
+        start = end + len(delimiter)
+    return spans
+
+
+def _replace(block, spans, replacement):
+    """ block with each span replaced by replacement(start, delimiter, end) """
+    out = []
+    pos = 0
+    for start, delimiter, end in spans:
+        out.append(block[pos:start])
+        out.append(replacement(start, delimiter, end))
+        pos = end + len(delimiter)
+    out.append(block[pos:])
+    return ''.join(out)
+
+
+def _one_paragraph(block, start, end, table=False, in_list=False, terms=None):
+    """
+        Whether Markdown keeps block[start:end] within one paragraph, list
+        item or table cell
+    """
+    if table and _unescaped(block, '|', start, end):
+        return False
+    line_start = block.rfind('\n', 0, start) + 1
+    line_end = block.find('\n', start, end)
+    if line_end == -1:
+        return True
+    if table:
+        return False
+    depth = _quote_depth(block[line_start:line_end])
+    last_end = block.find('\n', end)
+    if line_start == 0 and last_end != -1 and SETEXT_RE.match(block, last_end + 1):
+        # On one line the math would make the block a heading
+        return False
+    lines = block[line_start:last_end if last_end != -1 else len(block)].split('\n')
+    if line_start == 0 and SETEXT_RE.match(lines[1]):
+        return False
+    if _content(lines[0])[1].startswith('#'):
+        # Not a heading only because the line ends in a backslash
+        return False
+    for index, line in enumerate(lines):
+        line_depth = _quote_depth(line)
+        line = _strip_quotes(line, line_depth) if index else _content(line)[1]
+        if line_depth > depth or BREAK_RE.match(line):
+            return False
+        if index and (DEFINITION_RE.match(line) or (in_list and ITEM_RE.match(line))):
+            return False
+    if terms is not None and terms.below(last_end + 1 if last_end != -1 else len(block) + 1, depth):
+        return False
+    return True
+
+
+def _unescaped(block, char, start, end):
+    """ Whether block[start:end] contains char without a backslash before it """
+    pos = block.find(char, start, end)
+    while pos != -1:
+        escape = pos
+        while escape and block[escape - 1] == '\\':
+            escape -= 1
+        if (pos - escape) % 2 == 0:
+            return True
+        pos = block.find(char, pos + 1, end)
+    return False
+
+
+def _code_end(block, indent, depth=0):
+    """ Where the indented code at the start of block, depth quotes in, ends """
+    lines = block.split('\n')
+    pos = len(lines[0]) + 1
+    for line in lines[1:]:
+        content = _strip_quotes(line, depth)
+        if not content.startswith(' ' * indent) and content.strip():
+            return pos
+        pos += len(line) + 1
+    return len(block)
+
+
+def _quoted_code(block):
+    """
+        The quote depth at which the first line of block is indented code,
+        or 0. List markers take the spaces after them along.
+    """
+    depth, line = _content(block.split('\n', 1)[0])
+    return depth if line.startswith('    ') else 0
+
+
+def _content(line):
+    """ The quote depth of line and what is left after its list and quote markers """
+    depth = 0
+    while True:
+        marker = MARKER_RE.match(line) or QUOTE_RE.match(line)
+        if marker is None:
+            return depth, line
+        if marker.re is QUOTE_RE:
+            depth += 1
+        line = line[marker.end():]
+
+
+def _quote_depth(line):
+    depth = 0
+    prefix = QUOTE_RE.match(line)
+    while prefix:
+        depth += 1
+        prefix = QUOTE_RE.match(line, prefix.end())
+    return depth
+
+
+def _backtick_runs(block):
+    """ Start offsets of the runs of backticks in block, by run length """
+    runs = {}
+    for m in OPENER_RE.finditer(block):
+        if m.group(0) != '$':
+            runs.setdefault(len(m.group(0)), []).append(m.start())
+    return runs
+
+
+def _code_span_end(block, start, end, runs):
+    """
+        Where scanning goes on after the run of backticks from start to end:
+        after the code span it opens, which ends at the next run of as many
+        backticks, or after the run itself when there is none. A backslash
+        escapes the first backtick of the run.
+    """
+    escape = start
+    while escape and block[escape - 1] == '\\':
+        escape -= 1
+    if (start - escape) % 2:
+        start += 1
+    starts = runs.get(end - start, ())
+    index = bisect.bisect_right(starts, start)
+    return starts[index] + end - start if index < len(starts) else end
+
+
+def _strip_quotes(line, depth):
+    for _ in range(depth):
+        prefix = QUOTE_RE.match(line)
+        if prefix is None:
+            break
+        line = line[prefix.end():]
+    return line
 
-        return node, m.start(0), m.end(0)
 
 class MathJax(Extension):
     def extendMarkdown(self, md):
-        mathjax_pattern = MathJaxPattern(r'(?<!\\)(\$\$?)(.+?)\1')
-        md.inlinePatterns.register(mathjax_pattern, 'mathjax', 200)
+        # After fenced code (25) and raw HTML blocks (20) are stashed
+        md.preprocessors.register(MathJaxPreprocessor(md), 'mathjax', 15)
+
+
+class MathML(Extension):
+    """ Like MathJax, but emits MathML where latex2mathml can convert the math """
+
+    def __init__(self, **kwargs):
+        self.config = {
+            'cache_dir': [os.path.join(os.path.expanduser('~'), '.remarkable', 'mathml-cache'),
+                          'directory the MathML of converted formulas is kept in']
+        }
+        super(MathML, self).__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        if latex_to_mathml is None:
+            preprocessor = MathJaxPreprocessor(md)
+        else:
+            directory = self.getConfig('cache_dir')
+            with _caches_lock:
+                cache = _caches.get(directory)
+                if cache is None:
+                    cache = _caches[directory] = MathMLCache(directory)
+            preprocessor = MathMLPreprocessor(md, cache)
+        md.preprocessors.register(preprocessor, 'mathjax', 15)
+
+
+# One cache per directory, shared by all Markdown instances
+_caches = {}
+_caches_lock = threading.Lock()
 
 def makeExtension(**kwargs):
     return MathJax(**kwargs)
 
+# Checks that math is found where the inline pattern this replaced found it,
+# and benchmarks both on finance-heavy text, where most $ are amounts rather
+# than math:
+# python -m remarkable.markdown.extensions.MathJax
+if __name__ == "__main__":
+    import time
+
+    from markdown.inlinepatterns import InlineProcessor
+
+    def inline_math(m, data):
+        node = etree.Element('mathjax')
+        node.text = markdown.util.AtomicString(m.group(0))
+        return node, m.start(0), m.end(0)
+
+    class InlineMathJax(Extension):
+        def extendMarkdown(self, md):
+            pattern = InlineProcessor(r'(?<!\\)(\$\$?)(.+?)\1')
+            pattern.handleMatch = inline_math
+            md.inlinePatterns.register(pattern, 'mathjax', 200)
+
+    SAMPLES = [
+        "Let $x$ and $$y$$ be\nnumbers, $a\nb$ too",
+        "- costs $5\n- income $10",
+        "1. costs $5\n2. income $10",
+        "- a $x\n  b$ c",
+        "| a | b |\n|---|---|\n| $1 | $2 |",
+        "a | b\n--|--\n$1 | $2",
+        "| $x$ | $y$ |\n|---|---|\n| a | b |",
+        "    \ntext $x$ y$",
+        "\n    code $x$\ntext $y$",
+        "    code $x\ntext$",
+        "- a\n\n    code $x$\n\n- b $y$",
+        "> quoted $x\n> math$",
+        ">     code $x$\n> text $y$",
+        "# Heading $x\ntext$",
+        "text $x\n# Heading$",
+        "$x\n---\ny$",
+        "\\$y$ but $z$",
+        "$\n$\n_> - x\n: ",
+        "Term $a\nterm b$\n: Definition $c$",
+        "> $a\n> b$\n> : c",
+        "$a\nb$\n\n: Definition",
+    ]
+    for text in SAMPLES:
+        expected = markdown.markdown(text, extensions=['markdown.extensions.extra', InlineMathJax()])
+        html = markdown.markdown(text, extensions=['markdown.extensions.extra', MathJax()])
+        assert html == expected, (text, html, expected)
+    print("%d samples match" % len(SAMPLES))
+
+    SENTENCE = ("Revenue grew from $1.2M to $3.4M, while costs of $250K and $75K were "
+                "offset by `$FEE` credits worth $$10$$ each; see $\\alpha = 0.05$. ")
+    DOCUMENTS = {
+        'report': (SENTENCE * 5 + "\n\n"),
+        'ledger': "Opening balance $1,000 and a closing balance of $2,500\n" * 20 + "\n",
+    }
+    for name, unit in sorted(DOCUMENTS.items()):
+        timings = []
+        for count in (50, 100, 200):
+            text = unit * count
+            for label, extension in (('preprocessor', MathJax()), ('inline', InlineMathJax())):
+                md = markdown.Markdown(extensions=[extension])
+                start = time.perf_counter()
+                md.convert(text)
+                seconds = time.perf_counter() - start
+                if label == 'preprocessor':
+                    timings.append(seconds)
+                print("%-7s %7d chars %-12s %.3f s" % (name, len(text), label, seconds))
+        # Doubling the text should about double the time
+        assert timings[-1] < 6 * timings[0], timings
@@ -0,0 +1,209 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import engine
+import prefilter
+from incremental import IncrementalRenderer
+from renderCache import RenderCache
+from renderProcess import RenderProcessError
+
+logger = logging.getLogger('remarkable')
+
+
+class RenderPipeline(object):
+    """
+        The single path from Markdown to HTML used by the live preview,
+        exports, copy and browser preview.
+
+        When the configured extensions fail on some content, the pipeline
+        bisects the extension list to find the failing extension and renders
+        with everything else. That configuration is remembered for the
+        content, so the same text is not parsed several times on every
+        keystroke; once the text changes the full extension set is tried
+        again. The live preview renders block by block, which keeps a
+        failure confined to the block that triggers it.
+
+        Each text is converted with only the extensions it can trigger, see
+        prefilter.select(); the output is the same as with all of them, and
+        an engine is cached for each such subset.
+
+        Given a RenderProcess, documents of at least process_size characters
+        are rendered in that process instead, keeping the GIL free for the
+        user interface. Set process_size to 0 to always render in-process.
+    """
+
+    MAX_FAILURES = 256
+    PROGRESSIVE_SIZE = 1024 * 1024  # Characters
+    PROCESS_SIZE = 128 * 1024  # Characters
+
+    def __init__(self, extensions, cache=None, verify=False, process=None):
+        self.extensions = list(extensions)
+        self.cache = cache if cache is not None else RenderCache()
+        self.process = process
+        self.process_size = self.PROCESS_SIZE
+        self.incremental = IncrementalRenderer(self.convert, verify)
+        self.failures = OrderedDict()  # content digest -> working extensions
+        self.broken = set()  # Extensions that cannot even be loaded
+        self.lock = threading.Lock()
+        # Held while render_blocks() runs on the render thread
+        self.blocks_lock = threading.Lock()
+
+    def set_extensions(self, extensions):
+        """
+            Render with a different extension set from now on. Waits for a
+            render_blocks() call in progress, so it never sees a mix of both.
+        """
+        with self.blocks_lock:
+            self.extensions = list(extensions)
+            self.incremental = IncrementalRenderer(self.convert, self.incremental.verify)
+            if self.process is not None:
+                self.process.set_extensions(extensions)
+
+    def render(self, text):
+        """ Render a complete HTML body """
+        key = self.cache.key(text, self.extensions, kind='body')
+        html = self.cache.get(key)
+        if html is None:
+            html = self._out_of_process('render', text)
+            if html is None:
+                html = self.convert(text)[0]
+            self.cache.put(key, html)
+        return html
+
+    def render_blocks(self, text, viewport=None):
+        """
+            Render the body as a list of (first source line, HTML) blocks.
+
+            For documents above PROGRESSIVE_SIZE the blocks around viewport,
+            a (first line, last line) tuple, are rendered first and the rest
+            are left as placeholders. Returns the blocks and whether the
+            document is complete; call again with the same text to continue.
+        """
+        with self.blocks_lock:
+            key = self.cache.key(text, self.extensions, kind='blocks')
+            blocks = self.cache.get(key)
+            if blocks is None:
+                if len(text) < self.PROGRESSIVE_SIZE:
+                    viewport = None
+                result = self._out_of_process('render_blocks', text, viewport)
+                if result is not None:
+                    blocks, complete = result
+                else:
+                    self.incremental.render(text, viewport)
+                    blocks = list(self.incremental.blocks)
+                    complete = self.incremental.complete
+                if not complete:
+                    return blocks, False
+                blocks = tuple(blocks)
+                self.cache.put(key, blocks)
+            return list(blocks), True
+
+    def render_page(self, text, html_start, html_end, rtl=False):
+        """ Render a complete HTML page around the body """
+        key = self.cache.key(text, self.extensions, html_start + html_end, rtl, kind='page')
+        html = self.cache.get(key)
+        if html is None:
+            html = html_start + self.render(text) + html_end
+            self.cache.put(key, html)
+        return html
+
+    def _out_of_process(self, method, text, *args):
+        """ Render in the worker process if text is big enough, None otherwise """
+        if self.process is None or not self.process.available:
+            return None
+        if not self.process_size or len(text) < self.process_size:
+            return None
+        try:
+            return getattr(self.process, method)(text, *args)
+        except RenderProcessError as e:
+            logger.warning("Rendering in the worker process failed, rendering in-process: %s", e)
+            return None
+
+    def convert(self, text, references=None):
+        """ Convert text, returning the HTML and the link references it knows """
+        digest = hashlib.sha1(text.encode('utf-8')).digest()
+        with self.lock:
+            extensions = self.failures.get(digest)
+            if extensions is not None:
+                self.failures.move_to_end(digest)
+        if extensions is None:
+            extensions = [e for e in self.extensions if e not in self.broken]
+        extensions = prefilter.select(extensions, text)
+
+        try:
+            return self._convert(extensions, text, references)
+        except Exception as e:
+            logger.debug("Rendering with %s failed: %s", extensions, e)
+
+        extensions = self._bisect(extensions, text, references)
+        with self.lock:
+            self.failures[digest] = extensions
+            while len(self.failures) > self.MAX_FAILURES:
+                self.failures.popitem(last=False)
+        return self._convert(extensions, text, references)
+
+    def _convert(self, extensions, text, references):
+        # Skip the extensions already known not to load, they are only reported once
+        extensions = [e for e in extensions if e not in self.broken]
+        try:
+            md_engine = engine.get(extensions)
+        except Exception:
+            # An extension that fails to load fails for every document
+            for extension in extensions:
+                try:
+                    engine.get([extension])
+                except Exception as e:
+                    with self.lock:
+                        if extension in self.broken:
+                            continue
+                        self.broken.add(extension)
+                    logger.warning("Disabling Markdown extension %s: %s", extension, e)
+            md_engine = engine.get([e for e in extensions if e not in self.broken])
+        return md_engine.convert_with_references(text, references)
+
+    def _works(self, extensions, text, references):
+        try:
+            self._convert(extensions, text, references)
+            return True
+        except Exception:
+            return False
+
+    def _bisect(self, extensions, text, references):
+        """ Disable failing extensions one at a time until the text renders """
+        working = list(extensions)
+        while working and not self._works(working, text, references):
+            # Find the shortest prefix of the list that fails, its last entry is to blame
+            works, fails = 0, len(working)
+            while fails - works > 1:
+                middle = (works + fails) // 2
+                if self._works(working[:middle], text, references):
+                    works = middle
+                else:
+                    fails = middle
+            logger.warning("Markdown extension %s failed, rendering without it", working[fails - 1])
+            del working[fails - 1]
+        return working
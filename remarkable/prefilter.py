@@ -0,0 +1,145 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import re
+
+CODE_HIGHLIGHT = 'remarkable.markdown.extensions.CodeHighlight:CodeHighlight'
+HIGHLIGHTING = 'remarkable.markdown.extensions.Highlighting:Highlighting'
+SMARTY = 'markdown.extensions.smarty'
+SUBSCRIPT = 'remarkable.markdown.extensions.Subscript:Subscript'
+TOC = 'markdown.extensions.toc'
+
+# What a text must contain for each optional extension to change its output,
+# as (pattern, extensions) pairs. Extensions that are not listed are always
+# used. The patterns are scanned as one alternation, so where two of them
+# can match at the same place the longer one comes first and also triggers
+# the extensions of the shorter one; using an extension needlessly is safe.
+TRIGGERS = [
+    # Setext heading underlines, also inside lists and blockquotes
+    (r'\n[ \t>]*(?:=+|-+)[ \t]*(?=\n|\Z)', (TOC, HIGHLIGHTING, SMARTY)),
+    (r'#|\[TOC\]|<[hH][1-6]', (TOC,)),  # md_in_html parses <hN markdown="1">
+    (r'\$', ('remarkable.markdown.extensions.MathJax:MathJax',
+             'remarkable.markdown.extensions.MathJax:MathML')),
+    (r'==', (HIGHLIGHTING,)),
+    # Fenced code, only highlighted when it has a language
+    (r'~~~', (CODE_HIGHLIGHT, 'remarkable.markdown.extensions.Strikethrough:Strikethrough',
+              SUBSCRIPT)),
+    (r'```', (CODE_HIGHLIGHT,)),
+    (r'~~', ('remarkable.markdown.extensions.Strikethrough:Strikethrough', SUBSCRIPT)),
+    (r'~', (SUBSCRIPT,)),
+    (r'\^', ('remarkable.markdown.extensions.Superscript:Superscript',)),
+    # Escaped brackets are unescaped before the postprocessor sees the list items
+    (r'\[\\?[ Xx]\\?\]', ('remarkable.markdown.extensions.Checklist:Checklist',)),
+    (r'[\'"]|--|\.\.\.', (SMARTY,)),
+]
+
+# Every pattern starts with one of these, the lookahead lets the scan skip plain text quickly
+FIRST = r'[\n#\[<$=~`^\'"\-.]'
+SCAN_RE = re.compile('(?=%s)(?:%s)' % (FIRST, '|'.join('(%s)' % pattern for pattern, names in TRIGGERS)))
+OPTIONAL = frozenset(name for pattern, names in TRIGGERS for name in names)
+
+
+def triggered(text):
+    """
+        The optional extensions text can trigger, in a single pass over it.
+
+        >>> sorted(name.rsplit('.', 1)[-1] for name in triggered("Some ~~old~~ text"))
+        ['Strikethrough:Strikethrough', 'Subscript:Subscript']
+        >>> sorted(name.rsplit('.', 1)[-1] for name in triggered("Title\\n====="))
+        ['Highlighting:Highlighting', 'smarty', 'toc']
+        >>> triggered("plain text, no markup at all")
+        set()
+    """
+    found = set()
+    seen = set()
+    for match in SCAN_RE.finditer(text):
+        index = match.lastindex
+        if index not in seen:
+            seen.add(index)
+            found.update(TRIGGERS[index - 1][1])
+            if len(found) == len(OPTIONAL):
+                break
+    return found
+
+
+def select(extensions, text):
+    """
+        The extensions, in their original order, that can affect the
+        rendering of text. Converting text with them gives exactly the same
+        HTML as converting it with all of extensions.
+
+        >>> select(['markdown.extensions.extra', 'markdown.extensions.smarty'], "no quotes")
+        ['markdown.extensions.extra']
+    """
+    found = triggered(text)
+    return [extension for extension in extensions if extension not in OPTIONAL or extension in found]
+
+
+if __name__ == '__main__':
+    # Prove that the prefilter never changes the output: python prefilter.py [FILE...]
+    import doctest
+    import os
+    import sys
+
+    import markdown
+
+    doctest.testmod()
+
+    EXTENSIONS = ['markdown.extensions.extra',
+                  'remarkable.markdown.extensions.Highlighting:Highlighting',
+                  'remarkable.markdown.extensions.AutoLink:AutoLink',
+                  'markdown.extensions.toc',
+                  'markdown.extensions.smarty',
+                  'remarkable.markdown.extensions.Strikethrough:Strikethrough',
+                  'remarkable.markdown.extensions.Checklist:Checklist',
+                  'remarkable.markdown.extensions.Superscript:Superscript',
+                  'remarkable.markdown.extensions.Subscript:Subscript',
+                  'remarkable.markdown.extensions.CodeHighlight:CodeHighlight',
+                  'remarkable.markdown.extensions.MathJax:MathJax']
+    SAMPLES = [
+        "Plain paragraph with google.com in it.\n\nAnother one.",
+        "# Heading\n\nText",
+        "Setext\n======\n\nSub\n---\n\n> Quoted\n> ---",
+        "[TOC]\n\nNo headings",
+        "<h2 markdown=\"1\">HTML *heading*</h2>",
+        "It's \"quoted\" -- and... more",
+        "==mark== ~~del~~ H~2~O x^2^ $x^2$ $$y$$",
+        "- [ ] todo\n- [x] done\n- \\[X\\] escaped",
+        "```python\nprint('fenced')\n```\n\n~~~ {.c #main}\nint main;\n~~~",
+        "Escaped \\$ and \\~ and \\^ and \\= \\=",
+        "| a | b |\n|---|---|\n| 1 | 2 |\n\nTerm\n: Definition\n\n*[HTML]: Hyper Text\n\nHTML[^1]\n\n[^1]: Note",
+    ]
+    media = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', 'media')
+    paths = sys.argv[1:] or [os.path.join(media, 'MarkdownTutorial.md')]
+    texts = SAMPLES + [open(path, encoding='utf-8').read() for path in paths]
+    # Every paragraph on its own as well, most of them trigger few extensions
+    texts += [part for text in list(texts) for part in text.split('\n\n')]
+
+    failures = 0
+    for text in texts:
+        expected = markdown.Markdown(extensions=EXTENSIONS).convert(text)
+        actual = markdown.Markdown(extensions=select(EXTENSIONS, text)).convert(text)
+        if actual != expected:
+            failures += 1
+            print("Output differs for %r:\n%s\n%s\n" % (text[:60], expected, actual))
+    print("%d texts, %d differences" % (len(texts), failures))
+    sys.exit(1 if failures else 0)
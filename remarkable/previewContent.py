@@ -0,0 +1,102 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import json
+import logging
+import os
+
+from gi.repository import WebKit2
+
+import assets
+from assetStore import AssetStore
+
+logger = logging.getLogger('remarkable')
+
+MATHJAX_CONFIG = {"showProcessingMessages": False, "messageStyle": "none",
+                  "tex2jax": {"inlineMath": [["$", "$"]]}}
+
+
+class PreviewContent(object):
+    """
+        Registers the live preview assets with WebKit once.
+
+        The font rules, the highlight.js theme, highlight.js, the MathJax
+        loader and preview.js are added to a WebKit2.UserContentManager, which
+        injects them into every page the preview loads. With math rendered as
+        MathML, see set_mathml(), MathJax only reads TeX. The pages handed to
+        load_html then only contain the style sheet and the rendered body.
+
+        Files the page loads by URL, like MathJax, are served from memory by
+        an AssetStore under remarkable://.
+    """
+
+    def __init__(self, media_path):
+        self.media_path = media_path
+        self.store = AssetStore()
+        self.store.register(WebKit2.WebContext.get_default())
+        self.store.mount("media", media_path)
+
+        mathjax = assets.find_mathjax(media_path)
+        if mathjax is not None:
+            mathjax_base = self.store.mount("mathjax", os.path.dirname(mathjax)) + "MathJax.js?config="
+
+        self.manager = WebKit2.UserContentManager()
+        for sheet in (assets.fonts_css(media_path), self._read('highlightjs.default.min.css')):
+            self.manager.add_style_sheet(WebKit2.UserStyleSheet.new(
+                sheet, WebKit2.UserContentInjectedFrames.TOP_FRAME,
+                WebKit2.UserStyleLevel.AUTHOR, None, None))
+        self.highlight = self._read('highlight.min.js') + '\n' + assets.HIGHLIGHT_JS
+        self.mathjax = {}
+        for config in (assets.MATHJAX_CONFIG, assets.MATHJAX_TEX_CONFIG):
+            if mathjax is None:
+                mathjax_url = assets.mathjax_url(media_path, config)
+            else:
+                mathjax_url = mathjax_base + config
+            self.mathjax[config] = ('window.MathJax = %s;\n' % json.dumps(MATHJAX_CONFIG) +
+                                    '(function () {\n' +
+                                    '    var script = document.createElement("script");\n' +
+                                    '    script.src = %s;\n' % json.dumps(mathjax_url) +
+                                    '    document.head.appendChild(script);\n' +
+                                    '})();')
+        self.preview = self._read('preview.js')
+        self.set_mathml(False)
+
+    def set_mathml(self, enabled):
+        """
+            Whether math is rendered as MathML. MathJax then only typesets the
+            formulas left as TeX and leaves the MathML to WebKit. Takes effect
+            on the next page load.
+        """
+        self.manager.remove_all_scripts()
+        mathjax = self.mathjax[assets.MATHJAX_TEX_CONFIG if enabled else assets.MATHJAX_CONFIG]
+        sources = [self.highlight, mathjax, self.preview]
+        for source in sources:
+            self.manager.add_script(WebKit2.UserScript.new(
+                source, WebKit2.UserContentInjectedFrames.TOP_FRAME,
+                WebKit2.UserScriptInjectionTime.END, None, None))
+
+    def _read(self, name):
+        text = self.store.get_text("media", name)
+        if text is None:
+            logger.warning("Could not load preview asset %s", name)
+            return ''
+        return text
@@ -0,0 +1,96 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+
+class RenderCache(object):
+    """
+        In-memory LRU cache of rendered HTML shared by the live preview,
+        exports, copy and browser preview.
+
+        Entries are keyed by a hash of the Markdown source together with the
+        extension set, style and RTL flag it was rendered with, and the kind
+        of result stored. Least recently
+        used entries are evicted once the stored HTML exceeds the byte budget.
+    """
+
+    def __init__(self, budget=32 * 1024 * 1024):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # Used from the render thread and the main loop
+
+    @staticmethod
+    def key(text, extensions, style=None, rtl=None, kind='body'):
+        """ kind tells apart what is stored for the same text, e.g. 'body' or 'blocks' """
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        if style is not None:
+            style = hashlib.sha1(style.encode('utf-8')).hexdigest()
+        return (digest, tuple(extensions), style, rtl, kind)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """ Store a string or a tuple of (line, string) blocks """
+        parts = (value,) if isinstance(value, str) else (html for line, html in value)
+        size = sum(sys.getsizeof(part) for part in parts)
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            if size > self.budget:
+                return
+            self.entries[key] = (value, size)
+            self.size += size
+            self._evict()
+
+    def set_budget(self, budget):
+        with self.lock:
+            self.budget = budget
+            self._evict()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return "Render cache: %d hits, %d misses, %d entries, %d bytes" % (
+            self.hits, self.misses, len(self.entries), self.size)
+
+    def _evict(self):
+        while self.size > self.budget and self.entries:
+            key, (value, size) = self.entries.popitem(last=False)
+            self.size -= size
@@ -0,0 +1,181 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import logging
+import os
+import pickle
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger('remarkable')
+
+
+# Responses are pickles prefixed with their length, so they can be read with a deadline
+HEADER = struct.Struct('!Q')
+
+
+class RenderProcessError(Exception):
+    pass
+
+
+class RenderProcess(object):
+    """
+        Runs a RenderPipeline in a separate, long-lived Python process.
+
+        Python-Markdown holds the GIL for the whole conversion, so rendering
+        a big document on a thread still slows down the GTK main loop. The
+        worker process is started once and kept warm; requests go out and
+        results come back as pickles over its stdin and stdout pipes. If the
+        process dies it is restarted on the next request, and after
+        MAX_RESTARTS crashes the backend gives up so callers fall back to
+        rendering in-process. A request that takes longer than TIMEOUT
+        seconds kills the process as well.
+    """
+
+    MAX_RESTARTS = 3
+    TIMEOUT = 60  # Seconds
+
+    def __init__(self, extensions):
+        self.extensions = list(extensions)
+        self.process = None
+        self.restarts = 0
+        self.lock = threading.Lock()
+
+    @property
+    def available(self):
+        return self.restarts < self.MAX_RESTARTS
+
+    def set_extensions(self, extensions):
+        """ The next request starts a process with these extensions """
+        with self.lock:
+            self.extensions = list(extensions)
+            self._kill()
+
+    def render(self, text):
+        return self._call('render', text)
+
+    def render_blocks(self, text, viewport=None):
+        return self._call('render_blocks', text, viewport)
+
+    def stop(self):
+        with self.lock:
+            self._kill()
+
+    def _call(self, method, *args):
+        with self.lock:
+            # Retry once in a fresh process, the request may have hit a crash
+            for attempt in range(2):
+                if not self.available:
+                    break
+                try:
+                    if self.process is None:
+                        self._start()
+                    pickle.dump((method, args), self.process.stdin, pickle.HIGHEST_PROTOCOL)
+                    self.process.stdin.flush()
+                    ok, result = self._receive(time.monotonic() + self.TIMEOUT)
+                except TimeoutError:
+                    # Rendering the same text again would only time out again
+                    self.restarts += 1
+                    logger.warning("Render process did not answer within %d s (%d/%d)",
+                                   self.TIMEOUT, self.restarts, self.MAX_RESTARTS)
+                    self._kill()
+                    raise RenderProcessError("Render process timed out")
+                except (OSError, EOFError, pickle.UnpicklingError) as e:
+                    self.restarts += 1
+                    logger.warning("Render process failed (%d/%d): %s", self.restarts, self.MAX_RESTARTS, e)
+                    self._kill()
+                    continue
+                if not ok:
+                    raise RenderProcessError(result)
+                return result
+        raise RenderProcessError("Render process unavailable")
+
+    def _receive(self, deadline):
+        """ Read one response, raising TimeoutError after deadline """
+        size, = HEADER.unpack(self._read(HEADER.size, deadline))
+        return pickle.loads(self._read(size, deadline))
+
+    def _read(self, size, deadline):
+        # Unbuffered reads on the descriptor, select() would miss buffered data
+        fd = self.process.stdout.fileno()
+        data = bytearray()
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise TimeoutError()
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                raise EOFError("Render process exited")
+            data += chunk
+        return bytes(data)
+
+    def _start(self):
+        # The worker needs the same modules as this process
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(p for p in sys.path if p)
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__)],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+        pickle.dump(self.extensions, self.process.stdin, pickle.HIGHEST_PROTOCOL)
+        self.process.stdin.flush()
+
+    def _kill(self):
+        if self.process is None:
+            return
+        try:
+            self.process.kill()
+            self.process.wait()
+            self.process.stdin.close()
+            self.process.stdout.close()
+        except OSError:
+            pass
+        self.process = None
+
+
+def serve():
+    """ Entry point of the worker process """
+    # Keep stray prints from imported modules out of the result pipe
+    results = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    requests = sys.stdin.buffer
+
+    from pipeline import RenderPipeline
+    pipeline = RenderPipeline(pickle.load(requests))
+    while True:
+        try:
+            method, args = pickle.load(requests)
+        except EOFError:
+            return
+        try:
+            response = (True, getattr(pipeline, method)(*args))
+        except Exception as e:
+            response = (False, "%s: %s" % (type(e).__name__, e))
+        response = pickle.dumps(response, pickle.HIGHEST_PROTOCOL)
+        results.write(HEADER.pack(len(response)) + response)
+        results.flush()
+
+
+if __name__ == '__main__':
+    serve()
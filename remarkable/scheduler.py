@@ -0,0 +1,102 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import time
+
+from gi.repository import GLib
+
+
+class PreviewScheduler(object):
+    """
+        Coalesces bursts of buffer changes into a single live preview render.
+
+        The delay before rendering follows the measured cost of recent renders:
+        cheap documents are rendered on the next idle iteration of the main loop,
+        expensive ones wait a little longer for the user to stop typing. A
+        pending render is never postponed past max_latency, so the preview keeps
+        up even while the user types continuously.
+    """
+
+    def __init__(self, render, cheap_cost=15, cost_factor=2.0, max_delay=750, max_latency=1500):
+        self.render = render
+        self.cheap_cost = cheap_cost  # ms, renders below this keep the instant feel
+        self.cost_factor = cost_factor
+        self.max_delay = max_delay  # ms
+        self.max_latency = max_latency  # ms
+        self.average_cost = 0.0  # ms, exponentially weighted moving average
+        self.source_id = None
+        self.idle = False
+        self.first_request = None
+
+    def request(self):
+        """ Ask for a render, coalescing with any render already pending """
+        now = time.monotonic()
+        if self.first_request is None:
+            self.first_request = now
+
+        delay = self.get_delay()
+        if self.source_id is not None:
+            if delay == 0 and self.idle:
+                return  # An idle render is already queued
+            GLib.source_remove(self.source_id)
+            self.source_id = None
+
+        self.idle = delay == 0
+        if self.idle:
+            self.source_id = GLib.idle_add(self._fire)
+        else:
+            # Never let the preview fall more than max_latency behind the editor
+            deadline = self.first_request + self.max_latency / 1000.0
+            delay = max(0, min(delay, int((deadline - now) * 1000)))
+            self.source_id = GLib.timeout_add(delay, self._fire)
+
+    def flush(self):
+        """ Run a pending render immediately """
+        if self.source_id is not None:
+            GLib.source_remove(self.source_id)
+            self._fire()
+
+    def cancel(self):
+        if self.source_id is not None:
+            GLib.source_remove(self.source_id)
+            self.source_id = None
+        self.first_request = None
+
+    def get_delay(self):
+        if self.average_cost < self.cheap_cost:
+            return 0
+        return int(min(self.max_delay, self.average_cost * self.cost_factor))
+
+    def record(self, cost):
+        """ Feed the duration of a finished render (in seconds) into the average """
+        cost *= 1000
+        if self.average_cost == 0:
+            self.average_cost = cost
+        else:
+            self.average_cost = 0.7 * self.average_cost + 0.3 * cost
+
+    def _fire(self):
+        self.source_id = None
+        self.first_request = None
+        # The render itself runs asynchronously, its cost is fed back with record()
+        self.render()
+        return False
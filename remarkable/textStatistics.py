@@ -0,0 +1,105 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import math
+import re
+
+# Markdown syntax and stray punctuation that do not count as words
+WORD_EXCEPTIONS = frozenset([
+    "#", "##", "###", "####", "#####", "######", "*", "**", "-", "+", "_", "/", "\\", ":",
+    ";", "@", "'", "~", "(", ")", "[", "]", "{", "}", "((", "))", "+-", "-+", "/=", ".", "|",
+    "!", "!!", "!!!", "$", "", "%", "^", "&"])
+SHORT_NUMBER = re.compile(r'[0-9]{1,3}').fullmatch  # List numbers and the like
+
+
+def count_words(text):
+    """
+        Count the words in text.
+
+        >>> count_words("## 12 Remarkable *is* a - markdown editor")
+        5
+    """
+    return sum(1 for word in text.split() if word not in WORD_EXCEPTIONS and not SHORT_NUMBER(word))
+
+
+class Statistics(object):
+    """
+        Word counts of a buffer, updated incrementally.
+
+        The number of words on every line is kept, and after an edit only the
+        lines the ChangeTracker reports as dirty are read back from the buffer
+        and counted again, so the cost of an update depends on the size of the
+        edit rather than the size of the document.
+    """
+
+    WORDS_PER_MINUTE = 200
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.version = None  # Tracker version the counts are up to date with
+        self.line_words = []
+        self.words = 0
+
+    def update(self):
+        """ Bring the counts up to date, returning the number of words """
+        buffer = self.tracker.buffer
+        line_count = buffer.get_line_count()
+        if self.version is None:
+            dirty = (0, line_count - 1)
+        else:
+            dirty = self.tracker.dirty_lines(self.version)
+        self.version = self.tracker.version
+        if dirty is None:
+            return self.words
+
+        first, last = dirty[0], min(dirty[1], line_count - 1)
+        # The dirty lines replace this many lines of the previous text
+        replaced = last - first + 1 - (line_count - len(self.line_words))
+        counts = [count_words(line) for line in self._lines(buffer, first, last, line_count)]
+        self.words += sum(counts) - sum(self.line_words[first:first + replaced])
+        self.line_words[first:first + replaced] = counts
+        return self.words
+
+    def _lines(self, buffer, first, last, line_count):
+        start = buffer.get_iter_at_line(first)
+        if last + 1 < line_count:
+            end = buffer.get_iter_at_line(last + 1)
+        else:
+            end = buffer.get_end_iter()
+        lines = buffer.get_text(start, end, False).split('\n')
+        if last + 1 < line_count:
+            lines.pop()  # After the newline that ends the last dirty line
+        return lines
+
+    def selection(self):
+        """ (words, characters, lines) of the selection, None without one """
+        buffer = self.tracker.buffer
+        if not buffer.get_has_selection():
+            return None
+        start, end = buffer.get_selection_bounds()
+        words = count_words(buffer.get_text(start, end, False))
+        return words, end.get_offset() - start.get_offset(), end.get_line() - start.get_line() + 1
+
+    @classmethod
+    def reading_time(cls, words):
+        """ Estimated reading time in whole minutes """
+        return int(math.ceil(words / float(cls.WORDS_PER_MINUTE)))
@@ -0,0 +1,101 @@
+### BEGIN LICENSE
+# Copyright (C) 2024 <Jamie McGowan> <jamiemcgowan.dev@gmail.com>
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+### END LICENSE
+
+
+import logging
+import threading
+import time
+
+from gi.repository import GLib
+
+logger = logging.getLogger('remarkable')
+
+
+class RenderWorker(object):
+    """
+        Converts Markdown on a background thread.
+
+        Every submitted text snapshot is tagged with a monotonically increasing
+        generation number. Only the newest pending snapshot is rendered, and a
+        result is handed back to the GTK main loop only if no newer snapshot
+        has been submitted in the meantime.
+
+        A render may report that it is not finished yet; the snapshot is then
+        rendered again, delivering each partial result, until it completes or
+        a newer snapshot arrives.
+    """
+
+    def __init__(self, render, deliver):
+        self.render = render  # Runs on the worker thread: render(snapshot) -> (html, finished)
+        self.deliver = deliver  # Runs on the main loop: deliver(html, cost)
+        self.generation = 0
+        self.pending = None
+        self.stopped = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="remarkable-render", daemon=True)
+        self.thread.start()
+
+    def submit(self, snapshot):
+        """ Queue a text snapshot for rendering, replacing any older pending one """
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, snapshot)
+            self.condition.notify()
+            return self.generation
+
+    def invalidate(self):
+        """ Discard the results of a render in progress, e.g. after a settings change """
+        with self.condition:
+            self.generation += 1
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.pending = None
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                generation, snapshot = self.pending
+                self.pending = None
+
+            while True:
+                start = time.monotonic()
+                try:
+                    html, finished = self.render(snapshot)
+                except Exception as e:
+                    logger.warning("Rendering failed: %s", e)
+                    break
+                GLib.idle_add(self._deliver, generation, html, time.monotonic() - start)
+                with self.condition:
+                    if finished or self.pending is not None or self.stopped or generation != self.generation:
+                        break
+
+    def _deliver(self, generation, html, cost):
+        # Runs on the main loop, drop results that a newer request superseded
+        if generation == self.generation and not self.stopped:
+            self.deliver(html, cost)
+        return False